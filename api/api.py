@@ -1,27 +1,245 @@
 import os, json
-from openai import OpenAI
-
-client = OpenAI(
-    api_key=os.environ["OPENAI_API_KEY"],
-    base_url=os.environ["OPENAI_API_BASE"]
-)
-
-def chat(prompt, model="gemini-2.5-flash"):
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-    )
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import ratelimit
+from pipeline.sequential import mean_ci
+
+# The openai package and the client are loaded on first use, so importing
+# metrics (or --help) needs neither openai nor credentials.
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(
+                api_key=os.environ["OPENAI_API_KEY"],
+                base_url=os.environ["OPENAI_API_BASE"]
+            )
+    return _client
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Ask for JSON output (response_format) when scoring. Set LLM_JSON_MODE=1 only
+# for endpoints that support it; it is switched off automatically if rejected.
+JSON_MODE = os.environ.get("LLM_JSON_MODE", "0") == "1"
+# Whether the endpoint honours `n` (several choices per request); cleared on first refusal
+SUPPORTS_N = os.environ.get("LLM_SUPPORTS_N", "1") == "1"
+
+# Token usage and latency per model, accumulated over all calls in this process
+USAGE = {}
+_usage_lock = threading.Lock()
+
+def _record_usage(model, resp, seconds):
+    usage = getattr(resp, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    with _usage_lock:
+        u = USAGE.setdefault(model, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                                     "completion_tokens": 0, "seconds": 0.0})
+        u["calls"] += 1
+        u["seconds"] += seconds
+        if usage is not None:
+            u["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            u["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        if details is not None:
+            u["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+def usage_summary():
+    with _usage_lock:
+        out = {model: dict(u) for model, u in USAGE.items()}
+    for u in out.values():
+        u["seconds"] = round(u["seconds"], 2)
+        u["cached_ratio"] = round(u["cached_tokens"] / u["prompt_tokens"], 4) if u["prompt_tokens"] else 0.0
+    return out
+
+def get_openai():
+    import openai
+    return openai
+
+def _rate_key():
+    # Shared (cross-process) request budget for this endpoint and API key
+    return ratelimit.budget_key(host="llm", api_key=os.environ["OPENAI_API_KEY"])
+
+def _create(prompt, model, **kwargs):
+    openai = get_openai()
+    client = get_client()
+    rate_key = _rate_key()
+    for attempt in range(ratelimit.MAX_RETRIES + 1):
+        sent_at = ratelimit.acquire(rate_key)
+        t0 = time.monotonic()
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                **kwargs,
+            )
+        except openai.RateLimitError as e:
+            if attempt == ratelimit.MAX_RETRIES:
+                raise
+            headers = getattr(getattr(e, "response", None), "headers", None) or {}
+            ratelimit.throttled(rate_key, ratelimit.parse_retry_after(headers.get("retry-after")), sent_at)
+            continue
+        ratelimit.success(rate_key)
+        _record_usage(model, resp, time.monotonic() - t0)
+        return resp
+
+def chat(prompt, model=DEFAULT_MODEL, response_format=None):
+    kwargs = {"response_format": response_format} if response_format else {}
+    resp = _create(prompt, model, **kwargs)
     return resp.choices[0].message.content
 
 import re
 
+# <SCORE>9</SCORE>, <SCORE>9<\SCORE> (as in our own prompt examples), <score> 9/10 </Score>,
+# <SCORE>9<SCORE>, or an unclosed <SCORE>9 at the very end of the answer
+SCORE_TAG_RE = re.compile(
+    r"<\s*SCORE\s*>\s*\**\s*([+-]?\d+(?:\.\d+)?)(?:\s*/\s*10)?\s*\**\s*(?:<\s*[\\/]?\s*SCORE\s*>|$)",
+    re.IGNORECASE)
+SCORE_JSON_RE = re.compile(r"\{[^{}]*\"score\"[^{}]*\}", re.IGNORECASE | re.DOTALL)
+# "Score: 7" / "**Final score:** 7" on a line of its own, not "a BLEU score: 27.4" in the text
+SCORE_LABEL_RE = re.compile(
+    r"^[\s*#>-]*(?:final\s+|overall\s+)?score\s*\**\s*[:=]\s*\**\s*([+-]?\d+(?:\.\d+)?)(?:\s*/\s*10)?\s*\**\s*$",
+    re.IGNORECASE | re.MULTILINE)
+# Only labels in the last characters of the answer count as its verdict
+SCORE_LABEL_TAIL = 300
+SCORE_MIN, SCORE_MAX = 1, 10
+
+def _to_number(val_str):
+    return float(val_str) if ("." in val_str) else int(val_str)
+
+def _in_range(val):
+    return val if SCORE_MIN <= val <= SCORE_MAX else None
+
 def extract_score(s):
-    m = re.search(r"<SCORE>\s*([+-]?\d+(?:\.\d+)?)\s*</SCORE>", s)
-    if m:
-        val_str = m.group(1)
-        val = float(val_str) if ("." in val_str) else int(val_str)
+    """
+    Return the score in an LLM answer, or None if no known format matches
+    or the score is outside SCORE_MIN..SCORE_MAX (so it gets repaired).
+    """
+    if not s:
+        return None
+    # The last tag wins: models sometimes quote the example before answering
+    tags = SCORE_TAG_RE.findall(s)
+    if tags:
+        return _in_range(_to_number(tags[-1]))
+    for block in reversed(SCORE_JSON_RE.findall(s)):
+        try:
+            val = json.loads(block)
+        except ValueError:
+            continue
+        val = {k.lower(): v for k, v in val.items()}.get("score")
+        if isinstance(val, (int, float)) and not isinstance(val, bool):
+            return _in_range(val)
+        if isinstance(val, str) and re.fullmatch(r"\s*[+-]?\d+(?:\.\d+)?\s*", val):
+            return _in_range(_to_number(val.strip()))
+    labels = SCORE_LABEL_RE.findall(s[-SCORE_LABEL_TAIL:])
+    if labels:
+        return _in_range(_to_number(labels[-1]))
+    return None
+
+JSON_INSTRUCTION = """
+
+Respond with a JSON object of the form {"reasoning": "<brief reasoning>", "score": <integer>}."""
+
+REPAIR_TEMPLATE = """Below is an answer that evaluated a paper and was supposed to end with a score wrapped in <SCORE> and </SCORE>, but the score could not be read.
+
+Reply with ONLY the final integer score from that answer, in the form <SCORE>n</SCORE>. If the answer gives no score, infer it from the answer's own judgement on the 1-10 scale.
+
+Answer:
+{}
+"""
+
+def chat_samples(prompt, model=DEFAULT_MODEL, n=1):
+    """
+    Return n answers to the same prompt. Uses the `n` parameter when the
+    endpoint supports it; otherwise sends one call first (so providers with
+    prompt caching can cache the prompt) and the remaining ones concurrently.
+    """
+    global SUPPORTS_N
+    if n <= 1:
+        return [chat(prompt, model=model)]
+    if SUPPORTS_N:
+        try:
+            resp = _create(prompt, model, n=n)
+            answers = [c.message.content for c in resp.choices]
+            if len(answers) >= n:
+                return answers[:n]
+            # Some OpenAI-compatible proxies silently ignore n
+            print(f"[API] {model} returned {len(answers)} of {n} choices, falling back to concurrent calls")
+        except get_openai().BadRequestError as e:
+            print(f"[API] n={n} rejected by {model}, falling back to concurrent calls: {e}")
+            answers = []
+        SUPPORTS_N = False
     else:
-        print(s)
-    return val
+        answers = []
+    if not answers:
+        answers.append(chat(prompt, model=model))
+    with ThreadPoolExecutor(max_workers=n - len(answers)) as pool:
+        answers.extend(pool.map(lambda _: chat(prompt, model=model), range(n - len(answers))))
+    return answers
+
+def summarize_scores(scores):
+    """
+    Mean/median/spread of several sampled scores; "score" is the mean and
+    "ci95" a Student t interval (k is small), None for a single score.
+    """
+    ci = mean_ci(scores)
+    std = statistics.stdev(scores) if len(scores) > 1 else 0.0
+    return {
+        "score": ci["mean"],
+        "median": statistics.median(scores),
+        "std": round(std, 4),
+        "min": min(scores),
+        "max": max(scores),
+        "ci95": ci["ci95"],
+        "n": len(scores),
+        "samples": scores,
+    }
+
+def _parse_or_repair(answer, model):
+    score = extract_score(answer)
+    if score is not None:
+        return score
+    repaired = chat(REPAIR_TEMPLATE.format(answer[-4000:] if answer else ""), model=model)
+    score = extract_score(repaired)
+    if score is None:
+        raise ValueError(f"Cannot parse score from answer: {(answer or '')[-300:]!r}")
+    return score
+
+def chat_score(prompt, model=DEFAULT_MODEL, samples=1):
+    """
+    Ask for a score and parse it. On a formatting slip, send a small repair
+    prompt containing only the previous answer (never the paper again).
+    Raises ValueError if the score still cannot be parsed.
+
+    With samples > 1, k answers are requested in one go (see chat_samples)
+    and a summarize_scores dict is returned instead of a number.
+    """
+    global JSON_MODE
+    if samples > 1:
+        scores = []
+        for answer in chat_samples(prompt, model=model, n=samples):
+            try:
+                scores.append(_parse_or_repair(answer, model))
+            except ValueError as e:
+                print(f"[API] dropping unparsable sample: {e}")
+        if not scores:
+            raise ValueError(f"None of {samples} sampled answers had a parsable score")
+        return summarize_scores(scores)
 
+    answer = None
+    if JSON_MODE:
+        try:
+            answer = chat(prompt + JSON_INSTRUCTION, model=model, response_format={"type": "json_object"})
+        except get_openai().BadRequestError as e:
+            # Endpoint does not support response_format: stop asking for it
+            print(f"[API] JSON mode rejected by {model}, falling back to <SCORE> tags: {e}")
+            JSON_MODE = False
+    if answer is None:
+        answer = chat(prompt, model=model)
+    return _parse_or_repair(answer, model)
@@ -0,0 +1,205 @@
+# Adaptive rate limiting shared by every network client (arXiv, ar5iv,
+# Crossref, doi.org, LLM), coordinated across processes through small state
+# files guarded by a file lock. Pipelines running side by side draw from the
+# same per-host / per-API-key budget.
+#
+# Each budget is a minimum interval between requests. It doubles on
+# throttling (429/503, up to max_interval), at most once per congestion
+# event: throttles of requests sent before the last backoff, or arriving
+# while it is still in force, only honour their Retry-After. The excess over
+# min_interval then decays with time (a fixed half-life, so a stale state
+# file recovers by itself) and shrinks by a constant factor per success.
+# A Retry-After header blocks the budget for everyone until it has passed.
+
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+STATE_DIR = os.environ.get("RATE_LIMIT_DIR", "data/ratelimit")
+# Optional overrides: {"export.arxiv.org": {"min_interval": 3.0}, ...}
+BUDGETS_PATH = os.path.join(STATE_DIR, "budgets.json")
+
+# Seconds between requests per budget key
+DEFAULT_BUDGETS = {
+    "export.arxiv.org": {"min_interval": 3.0, "max_interval": 60.0},
+    "arxiv.org": {"min_interval": 1.0, "max_interval": 60.0},
+    "ar5iv.org": {"min_interval": 1.0, "max_interval": 60.0},
+    "ar5iv.labs.arxiv.org": {"min_interval": 1.0, "max_interval": 60.0},
+    "api.crossref.org": {"min_interval": 0.1, "max_interval": 30.0},
+    "doi.org": {"min_interval": 0.1, "max_interval": 30.0},
+    "llm": {"min_interval": 0.0, "max_interval": 60.0},
+}
+FALLBACK_BUDGET = {"min_interval": 0.5, "max_interval": 60.0}
+# Seconds for the interval's excess over min_interval to halve
+RECOVERY_HALF_LIFE = 60.0
+# Share of the excess kept after each successful request
+SUCCESS_DECAY = 0.9
+THROTTLE_STATUS = (429, 503)
+MAX_RETRIES = 5
+
+try:
+    import fcntl
+
+    def _lock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+_budgets = None
+
+def _load_budgets():
+    global _budgets
+    if _budgets is None:
+        budgets = {k: dict(v) for k, v in DEFAULT_BUDGETS.items()}
+        if os.path.exists(BUDGETS_PATH):
+            with open(BUDGETS_PATH, "r", encoding="utf-8") as f:
+                for k, v in json.load(f).items():
+                    budgets.setdefault(k, dict(FALLBACK_BUDGET)).update(v)
+        _budgets = budgets
+    return _budgets
+
+def configure(key, **budget):
+    """Override a budget in this process, e.g. configure("export.arxiv.org", min_interval=0)."""
+    _load_budgets().setdefault(key, dict(FALLBACK_BUDGET)).update(budget)
+
+def budget_key(url=None, host=None, api_key=None):
+    """Budget key for a host, optionally split per API key (never stored in clear)."""
+    host = host or urlparse(url).hostname or "unknown"
+    if api_key:
+        host += ":" + hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:10]
+    return host
+
+def _budget(key):
+    budgets = _load_budgets()
+    return budgets.get(key) or budgets.get(key.split(":", 1)[0]) or FALLBACK_BUDGET
+
+def _update_state(key, fn):
+    """Run fn(state) -> (state, result) under the cross-process lock for key."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    safe = key.replace("/", "_").replace(":", "_")
+    path = os.path.join(STATE_DIR, safe + ".json")
+    with open(path + ".lock", "a+") as lf:
+        _lock(lf)
+        try:
+            state = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        state = json.load(f)
+                except ValueError:
+                    state = {}
+            state, result = fn(state)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        finally:
+            _unlock(lf)
+    return result
+
+def _recover(state, b, now):
+    """Apply the time-based decay toward min_interval since the last update."""
+    interval = state.get("interval", b["min_interval"])
+    elapsed = max(0.0, now - state.get("updated", now))
+    excess = max(0.0, interval - b["min_interval"]) * 0.5 ** (elapsed / RECOVERY_HALF_LIFE)
+    state["interval"] = b["min_interval"] + excess
+    state["updated"] = now
+    return state["interval"]
+
+def acquire(key):
+    """Reserve the next request slot for key, sleep until it comes and return its time."""
+    b = _budget(key)
+
+    def reserve(state):
+        now = time.time()
+        interval = _recover(state, b, now)
+        slot = max(now, state.get("next_time", 0.0))
+        state["next_time"] = slot + interval
+        return state, slot - now
+
+    wait = _update_state(key, reserve)
+    if wait > 0:
+        time.sleep(wait)
+    return time.time()
+
+def success(key):
+    b = _budget(key)
+
+    def relax(state):
+        interval = _recover(state, b, time.time())
+        state["interval"] = b["min_interval"] + (interval - b["min_interval"]) * SUCCESS_DECAY
+        return state, None
+
+    _update_state(key, relax)
+
+def throttled(key, retry_after=None, sent_at=None):
+    """
+    Back off after a 429/503: double the interval and honour Retry-After.
+    `sent_at` (from acquire) lets throttles of requests already in flight
+    at the last backoff count as the same congestion event.
+    """
+    b = _budget(key)
+
+    def backoff(state):
+        now = time.time()
+        interval = _recover(state, b, now)
+        same_event = now < state.get("backoff_until", 0.0) or (
+            sent_at is not None and sent_at < state.get("backoff_at", 0.0))
+        if not same_event:
+            interval = min(b["max_interval"], max(interval, b["min_interval"], 0.5) * 2)
+            state["interval"] = interval
+            state["backoff_at"] = now
+        pause = retry_after if retry_after is not None else (0.0 if same_event else interval)
+        state["next_time"] = max(state.get("next_time", 0.0), now + pause)
+        if not same_event:
+            state["backoff_until"] = state["next_time"]
+        return state, None
+
+    _update_state(key, backoff)
+
+def parse_retry_after(value):
+    """Retry-After is either seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def limited_get(url, key=None, max_retries=MAX_RETRIES, **kwargs):
+    """requests.get under the shared budget for url's host, retrying on throttling."""
+    import requests
+
+    key = key or budget_key(url)
+    for attempt in range(max_retries + 1):
+        sent_at = acquire(key)
+        r = requests.get(url, **kwargs)
+        if r.status_code not in THROTTLE_STATUS or attempt == max_retries:
+            if r.status_code not in THROTTLE_STATUS:
+                success(key)
+            return r
+        throttled(key, parse_retry_after(r.headers.get("Retry-After")), sent_at)
+    return r
@@ -0,0 +1,41 @@
+# Single entry point for the whole study. Run in root:
+# python cli.py <command> [args...]
+#
+# Each command imports only the modules it needs, so e.g. `index` or
+# `report` never loads openai, bs4 or tiktoken.
+
+import argparse
+import sys
+
+COMMANDS = {
+    "index": ("dataset.fetch_index", "Harvest arXiv IDs of a year into data/indices"),
+    "fetch": ("dataset.fetch_paper", "Download or refresh papers into data/papers"),
+    "score": ("pipeline.get_metrics", "Sample, download and score papers"),
+    "merge": ("pipeline.shards", "Merge sharded score results: merge DIR... [--out DIR]"),
+    "cite": ("ref_ai", "Verify references and compute citation AI rates"),
+    "report": ("pipeline.report", "Summarize scores per domain and metric"),
+}
+# Commands that map onto a subcommand of their module's own parser
+SUBCOMMANDS = {
+    "merge": ["merge"],
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    ap = argparse.ArgumentParser(
+        description="problematic-papers command line.",
+        epilog="\n".join(f"  {name:<8} {desc}" for name, (_, desc) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("command", choices=COMMANDS, help="Command to run; `<command> --help` for its options")
+    ap.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    ns = ap.parse_args(argv[:1])
+
+    import importlib
+    module = importlib.import_module(COMMANDS[ns.command][0])
+    return module.main(SUBCOMMANDS.get(ns.command, []) + argv[1:])
+
+
+if __name__ == "__main__":
+    main()
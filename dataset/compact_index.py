@@ -0,0 +1,302 @@
+# Compact, memory-mapped form of indices_{year}.json.
+#
+# indices_{year}.idx holds every domain's arXiv IDs sorted and encoded as
+# fixed-width ASCII records (NUL padded), so opening an index is one mmap and
+# membership is a binary search. The JSON file stays the source of truth; the
+# .idx is rebuilt from it whenever it is missing or older.
+#
+# File layout (little endian):
+#   header   b"ARXIDX1\0", u32 record width, u32 number of domains
+#   domains  per domain: name (16 bytes, NUL padded), u64 first record, u64 count
+#   records  all domains' IDs, each domain sorted
+#
+# Paper status (downloaded / validated / scored) is kept as one bitmap per
+# status over the record positions, in indices_{year}.{status}.bits, so
+# "is this paper already downloaded / validated / scored" is a bit test.
+# When the files are missing or older than the index, only the sampled
+# papers are checked against the filesystem (sync); scan() rebuilds the
+# whole index on request.
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+
+INDICES_DIR = "data/indices"
+MAGIC = b"ARXIDX1\0"
+# Longest IDs are old-style ones such as "cond-mat/0601001"
+ID_WIDTH = 16
+NAME_WIDTH = 16
+STATUSES = ("downloaded", "validated", "scored")
+
+_HEADER = struct.Struct("<8sII")
+_DOMAIN = struct.Struct(f"<{NAME_WIDTH}sQQ")
+
+
+def _encode(arxiv_id):
+    raw = arxiv_id.encode("ascii")
+    if len(raw) > ID_WIDTH:
+        raise ValueError(f"arXiv ID longer than {ID_WIDTH} bytes: {arxiv_id!r}")
+    return raw.ljust(ID_WIDTH, b"\0")
+
+
+def index_path(year, indices_dir=INDICES_DIR):
+    return os.path.join(indices_dir, f"indices_{year}.idx")
+
+
+def write_compact_index(domains, path):
+    """Write {domain: [arxiv_id, ...]} (other keys such as "meta" are ignored)."""
+    names = [name for name, ids in domains.items() if isinstance(ids, list)]
+    parts, table, start = [], [], 0
+    for name in names:
+        ids = sorted({_encode(a) for a in domains[name]})
+        table.append(_DOMAIN.pack(name.encode("ascii"), start, len(ids)))
+        parts.append(b"".join(ids))
+        start += len(ids)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, ID_WIDTH, len(names)))
+        f.writelines(table)
+        f.writelines(parts)
+    os.replace(tmp, path)
+
+
+class IdArray(Sequence):
+    """Read-only view of a sorted run of records; indexing decodes one ID."""
+
+    def __init__(self, buf, offset, count):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def _raw(self, i):
+        at = self._offset + i * ID_WIDTH
+        return self._buf[at:at + ID_WIDTH]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self._raw(i).rstrip(b"\0").decode("ascii")
+
+    def find(self, arxiv_id):
+        """Position of arxiv_id in this run, or -1."""
+        key = _encode(arxiv_id)
+        raw = _RawView(self)
+        i = bisect.bisect_left(raw, key)
+        return i if i < self._count and raw[i] == key else -1
+
+    def __contains__(self, arxiv_id):
+        return self.find(arxiv_id) >= 0
+
+
+class _RawView(Sequence):
+    # bisect over the padded bytes without decoding
+    def __init__(self, arr):
+        self._arr = arr
+
+    def __len__(self):
+        return len(self._arr)
+
+    def __getitem__(self, i):
+        return self._arr._raw(i)
+
+
+class CompactIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, width, n = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or width != ID_WIDTH:
+            raise ValueError(f"{path} is not a compact arXiv index")
+        records = _HEADER.size + n * _DOMAIN.size
+        self._domains = {}
+        for k in range(n):
+            name, start, count = _DOMAIN.unpack_from(self._buf, _HEADER.size + k * _DOMAIN.size)
+            self._domains[name.rstrip(b"\0").decode("ascii")] = (start, IdArray(self._buf, records + start * ID_WIDTH, count))
+        self.size = sum(len(ids) for _, ids in self._domains.values())
+
+    def domains(self):
+        return list(self._domains)
+
+    def ids(self, domain):
+        """Sorted IDs of a domain as a lazy sequence (usable with random.sample)."""
+        return self._domains[domain][1]
+
+    def position(self, domain, arxiv_id):
+        """Record number of (domain, arxiv_id) in the whole file, or -1."""
+        start, ids = self._domains[domain]
+        i = ids.find(arxiv_id)
+        return start + i if i >= 0 else -1
+
+    def positions(self, arxiv_id):
+        """Record numbers of arxiv_id in every domain that lists it."""
+        return [p for p in (self.position(d, arxiv_id) for d in self._domains) if p >= 0]
+
+    def __contains__(self, arxiv_id):
+        return any(arxiv_id in ids for _, ids in self._domains.values())
+
+
+def load_index(year, indices_dir=INDICES_DIR):
+    """Open indices_{year}.idx, (re)building it from indices_{year}.json if needed."""
+    path = index_path(year, indices_dir)
+    src = os.path.join(indices_dir, f"indices_{year}.json")
+    if os.path.exists(src) and (not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(src)):
+        with open(src, "r", encoding="utf-8") as f:
+            write_compact_index(json.load(f), path)
+    return CompactIndex(path)
+
+
+class StatusBitmap:
+    """A set of record positions stored as a bitmap."""
+
+    def __init__(self, size, bits=None):
+        self.size = size
+        self.bits = bytearray((size + 7) // 8) if bits is None else bytearray(bits)
+
+    def add(self, pos):
+        self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def discard(self, pos):
+        self.bits[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+
+    def __contains__(self, pos):
+        return pos >= 0 and bool(self.bits[pos >> 3] & (1 << (pos & 7)))
+
+    def __len__(self):
+        return sum(bin(b).count("1") for b in self.bits)
+
+    def _op(self, other, fn):
+        a = int.from_bytes(self.bits, "little")
+        b = int.from_bytes(other.bits, "little")
+        return StatusBitmap(self.size, fn(a, b).to_bytes(len(self.bits), "little"))
+
+    def __and__(self, other):
+        return self._op(other, lambda a, b: a & b)
+
+    def __or__(self, other):
+        return self._op(other, lambda a, b: a | b)
+
+    def __sub__(self, other):
+        return self._op(other, lambda a, b: a & ~b)
+
+    def positions(self):
+        for i, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                yield i * 8 + low.bit_length() - 1
+                byte ^= low
+
+
+class PaperStatus:
+    """
+    downloaded / validated / scored bitmaps of one year index. "downloaded"
+    and "validated" are per paper (all domains listing it), "scored" is per
+    (domain, paper). Thread-safe; save() ORs into the files on disk so
+    concurrent runs do not lose each other's bits, except those this run
+    explicitly unmarked.
+    """
+
+    def __init__(self, index, year, indices_dir=INDICES_DIR):
+        self.index = index
+        self.paths = {s: os.path.join(indices_dir, f"indices_{year}.{s}.bits") for s in STATUSES}
+        self.maps = {}
+        for s in STATUSES:
+            bitmap = self._read(s)
+            self.maps[s] = bitmap if bitmap is not None else StatusBitmap(index.size)
+        # Bits found stale in this run, removed from the files on save()
+        self.cleared = {s: StatusBitmap(index.size) for s in STATUSES}
+        # After scan() the files are replaced instead of merged
+        self._replace = False
+        self._lock = threading.Lock()
+
+    def _read(self, status):
+        """Bitmap on disk, or None if absent or built for an older index."""
+        path = self.paths[status]
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(self.index.path):
+            return None
+        with open(path, "rb") as f:
+            bits = f.read()
+        if len(bits) != (self.index.size + 7) // 8:
+            return None
+        return StatusBitmap(self.index.size, bits)
+
+    def missing(self):
+        """True when a status file is absent or predates the index (its bits are unknown)."""
+        return any(self._read(s) is None for s in STATUSES)
+
+    def _positions(self, status, arxiv_id, domain):
+        if domain is not None and status == "scored":
+            return [self.index.position(domain, arxiv_id)]
+        return self.index.positions(arxiv_id)
+
+    def mark(self, status, arxiv_id, domain=None):
+        with self._lock:
+            for pos in self._positions(status, arxiv_id, domain):
+                if pos >= 0:
+                    self.maps[status].add(pos)
+                    self.cleared[status].discard(pos)
+
+    def unmark(self, status, arxiv_id, domain=None):
+        with self._lock:
+            for pos in self._positions(status, arxiv_id, domain):
+                if pos >= 0:
+                    self.maps[status].discard(pos)
+                    self.cleared[status].add(pos)
+
+    def has(self, status, arxiv_id, domain=None):
+        with self._lock:
+            return any(pos in self.maps[status] for pos in self._positions(status, arxiv_id, domain))
+
+    def scan(self, papers_dir, result_dir):
+        """
+        Rebuild downloaded/scored from the filesystem (one pass over the
+        index). Validation is only recorded by the pipeline, so "validated"
+        keeps its bits for papers that are still downloaded.
+        """
+        validated = self.maps["validated"]
+        for s in ("downloaded", "scored"):
+            self.maps[s] = StatusBitmap(self.index.size)
+        for domain in self.index.domains():
+            for arxiv_id in self.index.ids(domain):
+                if os.path.exists(os.path.join(papers_dir, arxiv_id, "body.txt")):
+                    self.mark("downloaded", arxiv_id)
+                if os.path.exists(os.path.join(result_dir, f"eval_results_{domain}_{arxiv_id}.json")):
+                    self.mark("scored", arxiv_id, domain)
+        self.maps["validated"] = validated & self.maps["downloaded"]
+        self._replace = True
+
+    def sync(self, pairs, papers_dir, result_dir):
+        """Set or clear the bits of the given (domain, arxiv_id) pairs from the filesystem."""
+        for domain, arxiv_id in pairs:
+            if os.path.exists(os.path.join(papers_dir, arxiv_id, "body.txt")):
+                self.mark("downloaded", arxiv_id)
+            else:
+                self.unmark("downloaded", arxiv_id)
+                self.unmark("validated", arxiv_id)
+            if os.path.exists(os.path.join(result_dir, f"eval_results_{domain}_{arxiv_id}.json")):
+                self.mark("scored", arxiv_id, domain)
+            else:
+                self.unmark("scored", arxiv_id, domain)
+
+    def save(self):
+        with self._lock:
+            for s in STATUSES:
+                bitmap, path = self.maps[s], self.paths[s]
+                on_disk = None if self._replace else self._read(s)
+                if on_disk is not None:
+                    bitmap = (bitmap | on_disk) - self.cleared[s]
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(bitmap.bits)
+                os.replace(tmp, path)
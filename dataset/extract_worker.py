@@ -0,0 +1,223 @@
+# Run page extraction (BeautifulSoup, pdfminer) in separate worker processes
+# with a memory cap and a deadline, so one pathological page cannot OOM-kill
+# or stall the whole batch. Pages that go over a limit are quarantined and
+# skipped by later runs until the quarantine entry is removed.
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+QUARANTINE_PATH = "data/quarantine.json"
+# Per-task limits; the memory cap is an address-space limit (POSIX only)
+EXTRACT_MEMORY_MB = int(os.environ.get("EXTRACT_MEMORY_MB", "2048"))
+EXTRACT_TIMEOUT = float(os.environ.get("EXTRACT_TIMEOUT", "120"))
+# Downloads larger than this are not parsed at all
+MAX_PAGE_BYTES = int(os.environ.get("MAX_PAGE_MB", "64")) * 1024 * 1024
+# Extraction processes running at the same time
+EXTRACT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Threads are running when we extract, so never fork the current process
+_ctx = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_quarantine_lock = threading.Lock()
+
+
+class ExtractionLimitError(Exception):
+    """A task exceeded its memory/time limit or its worker died."""
+
+    def __init__(self, reason, detail=""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+def _set_memory_limit(memory_mb):
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_loop(conn, memory_mb):
+    # One task at a time, so the process limit is the per-task limit
+    _set_memory_limit(memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            conn.send(("ok", fn(*args)))
+        except MemoryError:
+            conn.send(("memory", f"over {memory_mb} MB"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, memory_mb):
+        self.memory_mb = memory_mb
+        self.conn, child = _ctx.Pipe()
+        self.proc = _ctx.Process(target=_worker_loop, args=(child, memory_mb), daemon=True)
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    def kill(self):
+        self.conn.close()
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join()
+
+
+class ExtractionPool:
+    """
+    Long-lived extraction processes, at most `workers` at a time. A worker
+    that times out, runs out of memory or dies is killed and replaced on
+    demand; healthy workers are recycled every `max_tasks` tasks so memory
+    kept by the allocator does not accumulate.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, memory_mb=EXTRACT_MEMORY_MB, max_tasks=50):
+        self.memory_mb = memory_mb
+        self.max_tasks = max_tasks
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _take(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self.memory_mb)
+
+    def _give_back(self, worker):
+        if worker.tasks >= self.max_tasks:
+            worker.conn.send(None)
+            worker.kill()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def run(self, fn, *args, timeout=EXTRACT_TIMEOUT):
+        """
+        Return fn(*args) computed in a worker process. fn must be a
+        module-level function. Raises ExtractionLimitError on memory/time
+        overruns or a crashed worker, RuntimeError if fn raised.
+        """
+        with self._slots:
+            worker = self._take()
+            worker.tasks += 1
+            try:
+                worker.conn.send((fn, args))
+                if not worker.conn.poll(timeout):
+                    raise ExtractionLimitError("timeout", f"over {timeout:g}s")
+                status, value = worker.conn.recv()
+            except ExtractionLimitError:
+                worker.kill()
+                raise
+            except (EOFError, OSError):
+                worker.proc.join(5)
+                worker.kill()
+                # Killed without a word, e.g. by the kernel OOM killer
+                raise ExtractionLimitError("crashed", f"worker exit code {worker.proc.exitcode}")
+            if status == "memory":
+                # Its heap is near the cap: do not reuse it
+                worker.kill()
+                raise ExtractionLimitError("memory", value)
+            self._give_back(worker)
+        if status == "ok":
+            return value
+        raise RuntimeError(value)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def run_isolated(fn, *args, timeout=EXTRACT_TIMEOUT):
+    """ExtractionPool.run on the shared default pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool()
+    return _pool.run(fn, *args, timeout=timeout)
+
+
+def load_quarantine(path=QUARANTINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quarantine_key(arxiv_id, source):
+    return f"{source}:{arxiv_id}"
+
+
+def is_quarantined(arxiv_id, source, path=QUARANTINE_PATH):
+    with _quarantine_lock:
+        return quarantine_key(arxiv_id, source) in load_quarantine(path)
+
+
+def quarantine(arxiv_id, source, reason, detail="", size=None, path=QUARANTINE_PATH):
+    """Remember that (source, arxiv_id) went over a limit."""
+    logging.warning(f"Quarantining {arxiv_id} from {source}: {reason} {detail}".rstrip())
+    with _quarantine_lock:
+        entries = load_quarantine(path)
+        entries[quarantine_key(arxiv_id, source)] = {
+            "arxiv_id": arxiv_id,
+            "source": source,
+            "reason": reason,
+            "detail": detail,
+            "bytes": size,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+
+def release_quarantine(arxiv_ids=None, path=QUARANTINE_PATH):
+    """Forget quarantine entries of arxiv_ids (all entries if None)."""
+    with _quarantine_lock:
+        entries = load_quarantine(path)
+        if not entries:
+            return
+        keep = {} if arxiv_ids is None else {k: e for k, e in entries.items() if e["arxiv_id"] not in set(arxiv_ids)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(keep, f, ensure_ascii=False, indent=2)
+
+
+def read_limited(r, limit=MAX_PAGE_BYTES):
+    """
+    Read a streamed requests response, giving up past `limit` bytes.
+    Returns the content, or None if the page is too large.
+    """
+    chunks, size = [], 0
+    for chunk in r.iter_content(chunk_size=1 << 16):
+        size += len(chunk)
+        if size > limit:
+            r.close()
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -3,40 +3,62 @@
 # ASCII only
 
 import sys
-import time
 import math as _pymath
 import random
 import argparse
 import urllib.parse
-import requests
 import xml.etree.ElementTree as ET
 import re
 import json
+import datetime
+
+from api import ratelimit
+from dataset.compact_index import index_path, write_compact_index
 
 ARXIV_API = "http://export.arxiv.org/api/query"
 UA = "your-app-name/1.0 (mailto:you@example.com)"
-RATE_DELAY = 2.0  # seconds between API calls (arXiv guidance)
+# Seconds between API calls come from the shared budget (api.ratelimit, arXiv guidance)
 
 NS = {
     "atom": "http://www.w3.org/2005/Atom",
     "opensearch": "http://a9.com/-/spec/opensearch/1.1/",
+    "arxiv": "http://arxiv.org/schemas/atom",
 }
 
-ID_RE_VERSION = re.compile(r"v\d+$")
+# Study domain -> arXiv category pattern ("math.*" matches every math.XX)
+DOMAINS = {
+    "cs.ai": "cs.AI",
+    "math": "math.*",
+}
+# Days per date window of the combined harvest; keeps each window under the page cap
+WINDOW_DAYS = 7
+MAX_PAGES_PER_QUERY = 5
 
-def _date_range_for_year(year: int):
-    y = int(year)
-    return f"{y}01010000", f"{y}12312359"
+ID_RE_VERSION = re.compile(r"v\d+$")
 
-def _build_query(cat_expr: str, year: int) -> str:
-    s, e = _date_range_for_year(year)
+def _build_window_query(cat_expr: str, start: str, end: str) -> str:
     # submittedDate range AND category expression
-    q = f"submittedDate:[{s} TO {e}] AND ({cat_expr})"
+    q = f"submittedDate:[{start} TO {end}] AND ({cat_expr})"
     return q
 
+def _date_windows(year: int, days: int = WINDOW_DAYS):
+    """Split a year into consecutive submittedDate windows of `days` days."""
+    d = datetime.date(int(year), 1, 1)
+    last = datetime.date(int(year), 12, 31)
+    while d <= last:
+        e = min(d + datetime.timedelta(days=days - 1), last)
+        yield d.strftime("%Y%m%d") + "0000", e.strftime("%Y%m%d") + "2359"
+        d = e + datetime.timedelta(days=1)
+
+def _category_matches(pattern: str, categories) -> bool:
+    if pattern.endswith(".*"):
+        prefix = pattern[:-1]
+        return any(c.startswith(prefix) for c in categories)
+    return pattern in categories
+
 def _http_get(url, params, timeout=60):
     headers = {"User-Agent": UA}
-    r = requests.get(url, params=params, headers=headers, timeout=timeout)
+    r = ratelimit.limited_get(url, params=params, headers=headers, timeout=timeout)
     r.raise_for_status()
     return r.text
 
@@ -45,90 +67,140 @@ def _parse_total_results(xml_text: str) -> int:
     tr = root.find("opensearch:totalResults", NS)
     return int(tr.text) if tr is not None and tr.text and tr.text.isdigit() else 0
 
-def _extract_ids_from_feed(xml_text: str):
+def _entry_id(entry):
+    ide = entry.find("atom:id", NS)
+    # Error entries (e.g. malformed id_list items) have no /abs/ id
+    if ide is None or not ide.text or "/abs/" not in ide.text:
+        return None
+    aid = ide.text.split("/abs/", 1)[-1]
+    aid = aid.split("?", 1)[0].split("#", 1)[0]
+    return ID_RE_VERSION.sub("", aid)
+
+def _text(entry, path):
+    node = entry.find(path, NS)
+    return " ".join(node.text.split()) if node is not None and node.text else ""
+
+def _extract_entries_from_feed(xml_text: str):
+    """Parse feed entries into {id, title, authors, published} dicts."""
     root = ET.fromstring(xml_text)
     out = []
     for entry in root.findall("atom:entry", NS):
-        ide = entry.find("atom:id", NS)
-        if ide is None or not ide.text:
+        aid = _entry_id(entry)
+        if aid is None:
             continue
-        aid = ide.text.split("/abs/", 1)[-1]
-        aid = aid.split("?", 1)[0].split("#", 1)[0]
-        aid = ID_RE_VERSION.sub("", aid)
-        out.append(aid)
+        m = re.search(r"v(\d+)$", _text(entry, "atom:id"))
+        out.append({
+            "id": aid,
+            "version": int(m.group(1)) if m else None,
+            "title": _text(entry, "atom:title"),
+            "authors": [_text(a, "atom:name") for a in entry.findall("atom:author", NS)],
+            "published": _text(entry, "atom:published"),
+            "categories": [c.get("term") for c in entry.findall("atom:category", NS) if c.get("term")],
+            "primary": (entry.find("arxiv:primary_category", NS).get("term")
+                        if entry.find("arxiv:primary_category", NS) is not None else None),
+        })
+    return out
+
+def fetch_metadata_by_ids(ids, batch_size: int = 200):
+    """
+    Look up many arXiv IDs with the API's id_list parameter, batch_size per
+    call. Returns {versionless_id: entry}; IDs that do not exist are absent.
+    """
+    ids = sorted({ID_RE_VERSION.sub("", i.strip()) for i in ids if i and i.strip()})
+    out = {}
+    for k in range(0, len(ids), batch_size):
+        batch = ids[k:k + batch_size]
+        params = {"id_list": ",".join(batch), "start": 0, "max_results": len(batch)}
+        xml_text = _http_get(ARXIV_API, params)
+        for e in _extract_entries_from_feed(xml_text):
+            out[e["id"]] = e
     return out
 
-def _fetch_ids_for_category_year(cat_expr: str, year: int, page_size: int = 2000):
-    ids = []
-    q = _build_query(cat_expr, year)
-    params = {
-        "search_query": q,
-        "start": 0,
-        "max_results": 1,
-        "sortBy": "submittedDate",
-        "sortOrder": "ascending",
-    }
-    xml_text = _http_get(ARXIV_API, params)
-    total = _parse_total_results(xml_text)
-    if total == 0:
-        return ids
-
-    # FIXME: Too many papers result in error.
-    # page through results
-    n_pages = min(int(_pymath.ceil(total / float(page_size))), 5)
-    for p in range(n_pages):
-        print(f'Fetching page {p}/{n_pages}...')
-        start = p * page_size
+def _fetch_entries_for_query(q: str, page_size: int = 2000, max_pages: int = MAX_PAGES_PER_QUERY):
+    # The first page also carries opensearch:totalResults, so no count-only probe
+    entries = []
+    n_pages = 1
+    p = 0
+    while p < n_pages:
         params = {
             "search_query": q,
-            "start": start,
+            "start": p * page_size,
             "max_results": page_size,
             "sortBy": "submittedDate",
             "sortOrder": "ascending",
         }
         xml_text = _http_get(ARXIV_API, params)
-        batch = _extract_ids_from_feed(xml_text)
+        if p == 0:
+            total = _parse_total_results(xml_text)
+            # FIXME: Too many papers result in error; narrower date windows avoid the cap.
+            n_pages = int(_pymath.ceil(total / float(page_size)))
+            if n_pages > max_pages:
+                print(f"WARNING: {total} results for {q}, only the first {max_pages * page_size} are fetched")
+                n_pages = max_pages
+        batch = _extract_entries_from_feed(xml_text)
         if not batch:
             break
-        ids.extend(batch)
-        time.sleep(RATE_DELAY)
-    return ids
+        entries.extend(batch)
+        p += 1
+    return entries
 
-def sample_arxiv_ids(year: int, seed: int = None):
+def harvest_domains(year: int, domains=None, window_days: int = WINDOW_DAYS):
+    """
+    One OR-ed category query per date window for all domains; each entry is
+    sorted into domains locally from its <category> terms, so cross-listed
+    papers are fetched once. Returns ({domain: sorted ids}, {id: metadata}).
     """
-    Return up to num_sample arXiv IDs (strings) for the given year,
-    restricted to cs.AI and Mathematics.
+    domains = domains or DOMAINS
+    cat_expr = " OR ".join(f"cat:{pat}" for pat in domains.values())
+    by_domain = {name: set() for name in domains}
+    meta = {}
+    windows = list(_date_windows(year, window_days))
+    for k, (start, end) in enumerate(windows):
+        print(f"Fetching window {k + 1}/{len(windows)} ({start[:8]}-{end[:8]})...")
+        for e in _fetch_entries_for_query(_build_window_query(cat_expr, start, end)):
+            meta[e["id"]] = {
+                "primary": e["primary"],
+                "categories": e["categories"],
+                "published": e["published"],
+                "title": e["title"],
+                "authors": e["authors"],
+            }
+            for name, pat in domains.items():
+                if _category_matches(pat, e["categories"]):
+                    by_domain[name].add(e["id"])
+    return {name: sorted(ids) for name, ids in by_domain.items()}, meta
+
+def sample_arxiv_ids(year: int, seed: int = None, domains=None, window_days: int = WINDOW_DAYS):
+    """
+    Return the arXiv IDs (strings) of the given year per domain (cs.AI and
+    Mathematics by default), plus a "meta" map with primary category,
+    categories, submission date, title and authors of every paper.
     """
     if seed is not None:
         random.seed(seed)
 
-    # Query cs.AI and Mathematics separately, then take union.
-    # For Mathematics, 'cat:math' matches the math group.
-    cs_ids = _fetch_ids_for_category_year("cat:cs.AI", year)
-    math_ids = _fetch_ids_for_category_year("cat:math.*", year)
-
-    cs_list = list(sorted(set(cs_ids)))
-    math_list = list(sorted(set(math_ids)))
-
-    return {
-        "cs.ai": cs_list,
-        "math": math_list,
-    }
+    result, meta = harvest_domains(year, domains, window_days)
+    result["meta"] = meta
+    return result
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser(description="Sample arXiv IDs from cs.AI and Mathematics for a given year.")
     ap.add_argument("year", type=int, help="Year, e.g., 2023")
     ap.add_argument("--seed", type=int, default=None, help="Random seed")
     ap.add_argument("--no-delay", action="store_true", help="DO NOT sleep between requests (not recommended)")
-    args = ap.parse_args()
+    ap.add_argument("--domain", action="append", default=None, metavar="NAME=CAT",
+                    help="Domain and arXiv category pattern, e.g. math=math.* (repeatable; default cs.ai and math)")
+    ap.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Days per harvest date window")
+    args = ap.parse_args(argv)
 
-    global RATE_DELAY
     if args.no_delay:
-        RATE_DELAY = 0.0
+        ratelimit.configure("export.arxiv.org", min_interval=0.0)
 
-    result = sample_arxiv_ids(args.year, seed=args.seed)
+    domains = dict(d.split("=", 1) for d in args.domain) if args.domain else None
+    result = sample_arxiv_ids(args.year, seed=args.seed, domains=domains, window_days=args.window_days)
     with open(f"data/indices/indices_{args.year}.json", "w") as f:
         json.dump(result, f)
+    write_compact_index(result, index_path(args.year))
 
 if __name__ == "__main__":
     main()
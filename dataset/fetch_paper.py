@@ -1,12 +1,16 @@
+import io
 import time
+import argparse
+import hashlib
 import json, os
 import re
-import requests
-from bs4 import BeautifulSoup, NavigableString, Tag
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from api import ratelimit
+from dataset.source_resolver import SourceResolver
+from dataset.fetch_index import fetch_metadata_by_ids
+from dataset.extract_worker import (run_isolated, read_limited, quarantine, is_quarantined,
+                                    load_quarantine, release_quarantine, ExtractionLimitError)
 
 # More professional user agent
 UA = "ArxivResearchBot/1.0 (mailto:research@example.com)"
@@ -15,6 +19,8 @@ REF_HEAD_RE = re.compile(r"^\s*(references|bibliography|reference|references and
 DOI_RE = re.compile(r"doi\.org/(10\.\d{4,9}/\S+)", re.IGNORECASE)
 ARXIV_RE = re.compile(r"arxiv\.org/(abs|pdf)/([a-z\-]+/\d{7}|\d{4}\.\d{4,5})(?:v\d+)?(?:\.pdf)?", re.IGNORECASE)
 
+PAPERS_DIR = "data/papers"
+
 # Set to True if you want to keep section numbers like "1 Introduction"
 KEEP_SEC_NUMBER = False
 
@@ -26,7 +32,8 @@ def _heading_level(tag_name: str) -> int:
         return int(tag_name[1:])
     return 7
 
-def _find_bibliography_container(soup: BeautifulSoup):
+def _find_bibliography_container(soup: "BeautifulSoup"):
+    from bs4 import NavigableString, Tag
     node = soup.select_one(".ltx_bibliography")
     if node:
         return node
@@ -59,7 +66,7 @@ def _find_bibliography_container(soup: BeautifulSoup):
             return wrapper
     return None
 
-def _replace_math_with_tex(root: Tag):
+def _replace_math_with_tex(root: "Tag"):
     for m in root.find_all("math"):
         tex = None
         sem = m.find("semantics")
@@ -78,13 +85,14 @@ def _replace_math_with_tex(root: Tag):
         repl = ("$$%s$$" % tex) if disp else ("$%s$" % tex)
         m.replace_with(repl)
 
-def _remove_reference_headings(soup: BeautifulSoup):
+def _remove_reference_headings(soup: "BeautifulSoup"):
     for h in list(soup.find_all(re.compile(r"^h[1-6]$", re.IGNORECASE))):
         title = _normalize_space(h.get_text(" ", strip=True))
         if REF_HEAD_RE.match(title):
             h.decompose()
 
-def _markdownize_headings(soup: BeautifulSoup, keep_number: bool = False):
+def _markdownize_headings(soup: "BeautifulSoup", keep_number: bool = False):
+    from bs4 import NavigableString
     for h in list(soup.find_all(re.compile(r"^h[1-6]$", re.IGNORECASE))):
         lvl = max(1, min(6, _heading_level(h.name or "")))
         h_local = h
@@ -95,10 +103,13 @@ def _markdownize_headings(soup: BeautifulSoup, keep_number: bool = False):
         if not title:
             h.decompose()
             continue
+        # Keep appendices recognizable once their "Appendix A" tag is stripped
+        if "ltx_title_appendix" in (h.get("class") or []) and not title.lower().startswith("appendix"):
+            title = "Appendix: " + title
         line = "#" * lvl + " " + title
         h.replace_with(NavigableString("\n" + line + "\n\n"))
 
-def extract_refs(soup: BeautifulSoup):
+def extract_refs(soup: "BeautifulSoup"):
     cont = _find_bibliography_container(soup)
     if not cont:
         return []
@@ -215,91 +226,169 @@ def _validate_paper_content(text):
     
     return True
 
-def _download_from_ar5iv(arxiv_id):
-    """Download paper from ar5iv.org."""
-    url = f"https://ar5iv.org/html/{arxiv_id}"
-    logging.info(f"Attempting to download from ar5iv: {url}")
+def _extract_from_html(html):
+    """Extract (body, refs) from a LaTeXML page (ar5iv or arxiv.org/html)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    
+    # Quick check for common error patterns in the page
+    title_text = soup.title.string.lower() if soup.title else ""
+    if any(x in title_text for x in ["error", "not found", "404", "403", "login", "access denied"]):
+        logging.warning(f"Error page detected: {title_text}")
+        return None, None
+    
+    # Check for arxiv landing page indicators
+    if soup.find("div", class_="submission-history") or soup.find("div", class_="submission-details"):
+        logging.warning("Found arxiv landing page indicators")
+        return None, None
+        
+    # Check for "View PDF" links that might indicate we're on a landing page, not the actual paper
+    view_pdf_links = soup.find_all("a", string=re.compile(r"view\s+pdf", re.IGNORECASE))
+    if view_pdf_links and len(view_pdf_links) > 0:
+        logging.warning("Found 'View PDF' links, likely a landing page")
+        return None, None
+    
+    # Remove non-content elements
+    for tag in soup(["script", "style", "header", "nav", "footer"]):
+        tag.decompose()
+    
+    # Check if we have actual content
+    main_content = soup.find("main") or soup.find("article") or soup.find("div", class_="ltx_page_main")
+    
+    if not main_content:
+        # Try to find the largest content div as a fallback
+        # A div never has more text than the div containing it, so only the
+        # outermost divs need measuring (serializing every nested div is
+        # quadratic on deep LaTeXML pages)
+        content_divs = [d for d in soup.find_all("div") if d.find_parent("div") is None]
+        if content_divs:
+            main_content = max(content_divs, key=lambda x: len(x.get_text()))  # Use the div with the most content
+        else:
+            logging.warning("No main content found in html page")
+            return None, None
+    
+    # Check if the main content has enough text
+    main_text = main_content.get_text(" ", strip=True)
+    if len(main_text) < 500:  # Reduced minimum length
+        logging.warning(f"Main content too short: {len(main_text)} characters")
+        return None, None
+    
+    # 1) normalize math to TeX
+    _replace_math_with_tex(soup)
+    
+    # 2) extract references
+    refs = extract_refs(soup)
+    
+    # 3) remove bibliography content and its heading
+    bibl = _find_bibliography_container(soup)
+    if bibl:
+        bibl.decompose()
+    _remove_reference_headings(soup)
+    
+    # 4) markdownize headings
+    _markdownize_headings(soup, keep_number=KEEP_SEC_NUMBER)
+    
+    # 5) extract text
+    body = (main_content or soup.find("body") or soup).get_text("\n", strip=True)
+    body = re.sub(r"\n{3,}", "\n\n", body)
+    
+    # Validate content
+    if not _validate_paper_content(body):
+        logging.warning("Content validation failed for html source")
+        return None, None
+        
+    return body, refs
+
+VERSION_IN_URL_RE = re.compile(r"v(\d+)(?:[/?#.]|$)")
+
+def _response_info(r, source):
+    """Fetch metadata kept in fetch.json: final URL, version, cache validators."""
+    m = VERSION_IN_URL_RE.search(r.url.rsplit("/", 1)[-1])
+    return {
+        "source": source,
+        "url": r.url,
+        "version": int(m.group(1)) if m else None,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+
+def _conditional_headers(conditional):
+    headers = {"User-Agent": UA}
+    if conditional:
+        if conditional.get("etag"):
+            headers["If-None-Match"] = conditional["etag"]
+        if conditional.get("last_modified"):
+            headers["If-Modified-Since"] = conditional["last_modified"]
+    return headers
+
+def _download_limited(arxiv_id, url, source, conditional=None):
+    """
+    Stream a page under the shared rate limit. Returns (response, content);
+    content is None for a 304, and (None, None) if the page is quarantined
+    or larger than MAX_PAGE_BYTES.
+    """
+    if is_quarantined(arxiv_id, source):
+        logging.info(f"Skipping quarantined {source} page of {arxiv_id}")
+        return None, None
+    r = ratelimit.limited_get(url, headers=_conditional_headers(conditional), timeout=60, stream=True)
+    if r.status_code == 304:
+        return r, None
+    r.raise_for_status()
+    content = read_limited(r)
+    if content is None:
+        quarantine(arxiv_id, source, "too_large", url)
+        return None, None
+    return r, content
+
+def _extract_limited(arxiv_id, source, fn, content):
+    """Run fn(content) in an extraction worker; quarantine the page on overruns."""
+    try:
+        return run_isolated(fn, content)
+    except ExtractionLimitError as e:
+        quarantine(arxiv_id, source, e.reason, e.detail, size=len(content))
+        return None
+
+def _html_text_and_refs(content):
+    # Worker-side entry point: decode and extract a LaTeXML page
+    return _extract_from_html(content.decode("utf-8", errors="replace"))
+
+def _download_html(arxiv_id, url, source, conditional=None):
+    """
+    Fetch a LaTeXML-rendered paper page and extract its text and references.
+    Returns (body, refs, info); with `conditional` (a previous fetch.json) an
+    unchanged page gives (None, None, {"not_modified": True, ...}).
+    Extraction runs in a memory- and time-limited worker process.
+    """
+    logging.info(f"Attempting to download from {source}: {url}")
     
     try:
-        r = requests.get(url, headers={"User-Agent": UA}, timeout=60)
-        r.raise_for_status()
+        r, content = _download_limited(arxiv_id, url, source, conditional)
+        if r is None:
+            return None, None, None
+        if r.status_code == 304:
+            return None, None, dict(conditional, not_modified=True)
         
         # Check if we got a redirect to a login page or error page
         if "login" in r.url.lower() or "error" in r.url.lower():
             logging.warning(f"Redirected to a login or error page: {r.url}")
-            return None, None
-        
-        soup = BeautifulSoup(r.text, "html.parser")
-        
-        # Quick check for common error patterns in the page
-        title_text = soup.title.string.lower() if soup.title else ""
-        if any(x in title_text for x in ["error", "not found", "404", "403", "login", "access denied"]):
-            logging.warning(f"Error page detected: {title_text}")
-            return None, None
-        
-        # Check for arxiv landing page indicators
-        if soup.find("div", class_="submission-history") or soup.find("div", class_="submission-details"):
-            logging.warning("Found arxiv landing page indicators")
-            return None, None
-            
-        # Check for "View PDF" links that might indicate we're on a landing page, not the actual paper
-        view_pdf_links = soup.find_all("a", string=re.compile(r"view\s+pdf", re.IGNORECASE))
-        if view_pdf_links and len(view_pdf_links) > 0:
-            logging.warning("Found 'View PDF' links, likely a landing page")
-            return None, None
-        
-        # Remove non-content elements
-        for tag in soup(["script", "style", "header", "nav", "footer"]):
-            tag.decompose()
-        
-        # Check if we have actual content
-        main_content = soup.find("main") or soup.find("article") or soup.find("div", class_="ltx_page_main")
+            return None, None, None
         
-        if not main_content:
-            # Try to find the largest content div as a fallback
-            content_divs = soup.find_all("div")
-            if content_divs:
-                # Sort divs by content length
-                content_divs.sort(key=lambda x: len(x.get_text()), reverse=True)
-                main_content = content_divs[0]  # Use the div with the most content
-            else:
-                logging.warning("No main content found in ar5iv page")
-                return None, None
-        
-        # Check if the main content has enough text
-        main_text = main_content.get_text(" ", strip=True)
-        if len(main_text) < 500:  # Reduced minimum length
-            logging.warning(f"Main content too short: {len(main_text)} characters")
-            return None, None
-        
-        # 1) normalize math to TeX
-        _replace_math_with_tex(soup)
-        
-        # 2) extract references
-        refs = extract_refs(soup)
-        
-        # 3) remove bibliography content and its heading
-        bibl = _find_bibliography_container(soup)
-        if bibl:
-            bibl.decompose()
-        _remove_reference_headings(soup)
-        
-        # 4) markdownize headings
-        _markdownize_headings(soup, keep_number=KEEP_SEC_NUMBER)
-        
-        # 5) extract text
-        body = (main_content or soup.find("body") or soup).get_text("\n", strip=True)
-        body = re.sub(r"\n{3,}", "\n\n", body)
-        
-        # Validate content
-        if not _validate_paper_content(body):
-            logging.warning("Content validation failed for ar5iv source")
-            return None, None
-            
-        return body, refs
+        extracted = _extract_limited(arxiv_id, source, _html_text_and_refs, content)
+        if extracted is None:
+            return None, None, None
+        body, refs = extracted
+        return body, refs, _response_info(r, source)
     except Exception as e:
-        logging.error(f"Error downloading from ar5iv: {e}")
-        return None, None
+        logging.error(f"Error downloading from {source}: {e}")
+        return None, None, None
+
+def _download_from_ar5iv(arxiv_id, conditional=None):
+    """Download paper from ar5iv.org."""
+    return _download_html(arxiv_id, f"https://ar5iv.org/html/{arxiv_id}", "ar5iv", conditional)
+
+def _download_from_arxiv_html(arxiv_id, conditional=None):
+    """Download paper from the native HTML rendering on arxiv.org."""
+    return _download_html(arxiv_id, f"https://arxiv.org/html/{arxiv_id}", "arxiv_html", conditional)
 
 def _download_from_arxiv_abstract(arxiv_id):
     """Download paper abstract from arxiv.org."""
@@ -307,15 +396,16 @@ def _download_from_arxiv_abstract(arxiv_id):
     logging.info(f"Attempting to download abstract from arxiv: {url}")
     
     try:
-        r = requests.get(url, headers={"User-Agent": UA}, timeout=60)
+        r = ratelimit.limited_get(url, headers={"User-Agent": UA}, timeout=60)
         r.raise_for_status()
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(r.text, "html.parser")
         
         # Extract abstract
         abstract = soup.find("blockquote", class_="abstract")
         if not abstract:
             logging.warning("No abstract found on arxiv page")
-            return None, None
+            return None, None, None
             
         # Get title
         title_element = soup.find("h1", class_="title")
@@ -332,54 +422,217 @@ def _download_from_arxiv_abstract(arxiv_id):
         # No references from abstract page
         refs = []
         
-        return body, refs
+        return body, refs, _response_info(r, "abstract")
     except Exception as e:
         logging.error(f"Error downloading from arxiv abstract: {e}")
-        return None, None
+        return None, None, None
+
+def _pdf_text(content):
+    # Worker-side entry point for PDF extraction
+    from pdfminer.high_level import extract_text
+    return extract_text(io.BytesIO(content))
+
+def _download_from_arxiv_pdf(arxiv_id, conditional=None):
+    """
+    Download the PDF from arxiv.org and extract plain text with pdfminer.six
+    (in an extraction worker, like HTML pages).
+    References are not recovered from PDFs: refs is None (unavailable),
+    unlike [] for a page whose bibliography is empty.
+    """
+    try:
+        import pdfminer  # noqa: F401
+    except ImportError:
+        logging.info("pdfminer.six not installed, skipping PDF extraction")
+        return None, None, None
+
+    url = f"https://arxiv.org/pdf/{arxiv_id}"
+    logging.info(f"Attempting to download pdf from arxiv: {url}")
+
+    try:
+        r, content = _download_limited(arxiv_id, url, "pdf", conditional)
+        if r is None:
+            return None, None, None
+        if r.status_code == 304:
+            return None, None, dict(conditional, not_modified=True)
+        if "pdf" not in r.headers.get("Content-Type", "").lower():
+            logging.warning(f"Not a pdf response: {r.headers.get('Content-Type')}")
+            return None, None, None
+        text = _extract_limited(arxiv_id, "pdf", _pdf_text, content)
+        if text is None:
+            return None, None, None
+        # pdfminer separates pages with form feeds and leaves hyphenated line breaks
+        body = text.replace("\f", "\n\n")
+        body = re.sub(r"(\w)-\n(\w)", r"\1\2", body)
+        body = re.sub(r"\n{3,}", "\n\n", body).strip()
+        return body, None, _response_info(r, "pdf")
+    except Exception as e:
+        logging.error(f"Error downloading from arxiv pdf: {e}")
+        return None, None, None
+
+# Candidate full-text sources, in default preference order
+SOURCES = [
+    ("ar5iv", _download_from_ar5iv),
+    ("arxiv_html", _download_from_arxiv_html),
+    ("pdf", _download_from_arxiv_pdf),
+]
+
+_resolver = None
 
-def _download_from_arxiv_pdf(arxiv_id):
+def _get_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = SourceResolver(SOURCES, validate=_validate_paper_content)
+    return _resolver
+
+def fetch_paper_with_info(arxiv_id):
     """
-    This is a placeholder for PDF extraction functionality.
-    In a real implementation, you would use a PDF extraction library like PyPDF2 or pdfminer.
+    Like ar5iv_text_and_refs, but also returns the fetch metadata
+    (source, url, version, ETag/Last-Modified) as a third element.
     """
-    logging.info(f"PDF extraction not implemented in this version")
-    return None, None
+    body, refs, source, info = _get_resolver().fetch(arxiv_id)
+    if body:
+        logging.info(f"Successfully downloaded paper {arxiv_id} from {source}")
+        return body, refs, info
+    
+    # If every source fails, raise an exception
+    raise Exception(f"Failed to download full paper content for {arxiv_id}")
 
 def ar5iv_text_and_refs(arxiv_id):
     """
     Download and extract text and references from an arxiv paper.
+    Tries ar5iv, arxiv.org/html and the PDF (see SourceResolver for hedging).
     Raises an exception if the full paper content cannot be downloaded.
     """
-    # Try ar5iv first (HTML version)
-    body, refs = _download_from_ar5iv(arxiv_id)
-    if body and _validate_paper_content(body):
-        logging.info(f"Successfully downloaded paper {arxiv_id} from ar5iv")
-        return body, refs
-    
-    # If ar5iv fails, raise an exception
-    raise Exception(f"Failed to download full paper content for {arxiv_id}")
+    body, refs, _ = fetch_paper_with_info(arxiv_id)
+    return body, refs
+
+def content_hash(body):
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+def load_fetch_info(arxiv_id, papers_dir=PAPERS_DIR):
+    path = os.path.join(papers_dir, arxiv_id, "fetch.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_paper(arxiv_id, body, refs, info=None, papers_dir=PAPERS_DIR):
+    """
+    Write body.txt, ref.json and fetch.json (version, validators, content hash).
+    refs=None (source without references, e.g. PDF) writes no ref.json and
+    records "refs_available": false, so citation checks skip the paper.
+    """
+    paper_dir = os.path.join(papers_dir, arxiv_id)
+    os.makedirs(paper_dir, exist_ok=True)
+    with open(os.path.join(paper_dir, "body.txt"), "w", encoding="utf-8") as f:
+        f.write(body)
+    ref_path = os.path.join(paper_dir, "ref.json")
+    if refs is not None:
+        with open(ref_path, "w", encoding="utf-8") as f:
+            json.dump(refs, f, ensure_ascii=False, indent=2)
+    elif os.path.exists(ref_path):
+        os.remove(ref_path)  # references of an older copy do not belong to this body
+    meta = dict(info or {})
+    meta["refs_available"] = refs is not None
+    meta.pop("not_modified", None)
+    meta["content_hash"] = content_hash(body)
+    meta["fetched_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    with open(os.path.join(paper_dir, "fetch.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+def refresh_paper(arxiv_id, latest_version=None, papers_dir=PAPERS_DIR):
+    """
+    Bring a downloaded paper up to date. Returns "unchanged" or "changed".
+
+    If `latest_version` (from the arXiv API) equals the stored version, no
+    request is made. Otherwise the source that produced the stored copy is
+    asked with If-None-Match/If-Modified-Since; a 304, or new content with
+    the same hash, counts as unchanged.
+    """
+    info = load_fetch_info(arxiv_id, papers_dir) or {}
+    old_hash = info.get("content_hash")
+    if old_hash is None:
+        body_path = os.path.join(papers_dir, arxiv_id, "body.txt")
+        if os.path.exists(body_path):
+            with open(body_path, "r", encoding="utf-8") as f:
+                old_hash = content_hash(f.read())
+    if latest_version is not None and info.get("version") == latest_version:
+        return "unchanged"
+
+    body = refs = new_info = None
+    fn = dict(SOURCES).get(info.get("source"))
+    if fn is not None:
+        body, refs, new_info = fn(arxiv_id, conditional=info)
+        if new_info and new_info.get("not_modified"):
+            if latest_version is not None and info.get("version") is None:
+                info["version"] = latest_version
+                save_paper_info(arxiv_id, info, papers_dir)
+            return "unchanged"
+        if body and not _validate_paper_content(body):
+            body = None
+    if not body:
+        body, refs, new_info = fetch_paper_with_info(arxiv_id)
+
+    if new_info is not None and new_info.get("version") is None:
+        new_info["version"] = latest_version
+    if content_hash(body) == old_hash:
+        # Same text under new validators: remember them, nothing to re-score
+        meta = dict(info, **{k: v for k, v in new_info.items() if v is not None})
+        save_paper_info(arxiv_id, meta, papers_dir)
+        return "unchanged"
+    save_paper(arxiv_id, body, refs, new_info, papers_dir)
+    return "changed"
+
+def save_paper_info(arxiv_id, info, papers_dir=PAPERS_DIR):
+    with open(os.path.join(papers_dir, arxiv_id, "fetch.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+def main(argv=None):
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    ap = argparse.ArgumentParser(description="Download (or refresh) arxiv papers into data/papers.")
+    ap.add_argument("ids", nargs="*", help="arXiv IDs (default: a small test set)")
+    ap.add_argument("--refresh", action="store_true",
+                    help="Conditionally re-fetch already downloaded papers (all of them if no IDs are given)")
+    ap.add_argument("--retry_quarantined", action="store_true",
+                    help="Clear the quarantine entries of the given IDs (all if none) before fetching")
+    ap.add_argument("--show_quarantine", action="store_true", help="List quarantined pages and exit")
+    args = ap.parse_args(argv)
+
+    if args.show_quarantine:
+        for e in load_quarantine().values():
+            print(f"{e['arxiv_id']}\t{e['source']}\t{e['reason']}\t{e['detail']}\t{e['at']}")
+        return
+    if args.retry_quarantined:
+        release_quarantine(args.ids or None)
+
+    if args.refresh:
+        ids = args.ids or sorted(d for d in os.listdir(PAPERS_DIR) if os.path.isdir(os.path.join(PAPERS_DIR, d)))
+        latest = fetch_metadata_by_ids(ids)
+        for aid in ids:
+            try:
+                status = refresh_paper(aid, latest.get(aid, {}).get("version"))
+                logging.info(f"Refreshed paper {aid}: {status}")
+            except Exception as e:
+                logging.error(f"Failed to refresh paper {aid}: {e}")
+        return
 
-def main():
     # Test with multiple paper IDs to ensure robustness
-    ids = ["2601.10679", "2310.06825", "2402.01703", "2312.11805", "2401.08406", "2305.14314", "1706.03762"]
+    ids = args.ids or ["2601.10679", "2310.06825", "2402.01703", "2312.11805", "2401.08406", "2305.14314", "1706.03762"]
     for aid in ids:
         try:
             logging.info(f"Processing paper: {aid}")
-            body, refs = ar5iv_text_and_refs(aid)
+            body, refs, info = fetch_paper_with_info(aid)
             
             # Save the results only if we have valid content
-            os.makedirs(f"data/papers/{aid}", exist_ok=True)
-            with open(f"data/papers/{aid}/body.txt", "w", encoding="utf-8") as f:
-                f.write(body)
-            with open(f"data/papers/{aid}/ref.json", "w", encoding="utf-8") as f:
-                json.dump(refs, f, ensure_ascii=False, indent=2)
+            save_paper(aid, body, refs, info)
             
             logging.info(f"Successfully saved paper {aid}")
         except Exception as e:
             logging.error(f"Failed to process paper {aid}: {e}")
             # Do not save anything for failed papers
-        time.sleep(2)
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
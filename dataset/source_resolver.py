@@ -0,0 +1,157 @@
+import json, os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Where per-source latencies and per-period outcomes are remembered between runs
+STATS_PATH = "data/source_stats.json"
+# Launch a hedged request once the current source is slower than this percentile
+HEDGE_PERCENTILE = 0.9
+# Hedge delay (seconds) used before we have enough latency samples for a source
+DEFAULT_HEDGE_DELAY = 8.0
+MIN_LATENCY_SAMPLES = 5
+# Only keep the most recent latencies per source
+MAX_LATENCY_SAMPLES = 200
+
+def period_key(arxiv_id: str) -> str:
+    """
+    Group arxiv IDs by submission period: "2601.10679" -> "2601",
+    "math/0601001" -> "math/0601".
+    """
+    aid = arxiv_id.strip()
+    if "/" in aid:
+        archive, num = aid.split("/", 1)
+        return f"{archive}/{num[:4]}"
+    return aid.split(".", 1)[0]
+
+def _percentile(values, q):
+    vals = sorted(values)
+    if not vals:
+        return None
+    k = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+    return vals[k]
+
+class SourceResolver:
+    """
+    Fetch a paper from several sources (ar5iv, arxiv.org/html, PDF...).
+
+    Sources are tried in the order that has worked best for the paper's
+    period. If the current source has not answered after the hedge delay
+    (HEDGE_PERCENTILE of its observed latency), the next source is started
+    in parallel and the first valid answer wins. A source that fails starts
+    the next one immediately.
+    """
+
+    def __init__(self, sources, validate=None, stats_path=STATS_PATH,
+                 hedge_percentile=HEDGE_PERCENTILE, default_delay=DEFAULT_HEDGE_DELAY):
+        # sources: list of (name, fn) with fn(arxiv_id) -> (body, refs, info)
+        self.sources = list(sources)
+        self.validate = validate
+        self.stats_path = stats_path
+        self.hedge_percentile = hedge_percentile
+        self.default_delay = default_delay
+        self._lock = threading.Lock()
+        self.stats = self._load_stats()
+
+    def _load_stats(self):
+        if self.stats_path and os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable source stats {self.stats_path}: {e}")
+        return {"latency": {}, "periods": {}}
+
+    def save_stats(self):
+        if not self.stats_path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+            tmp = f"{self.stats_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.stats_path)
+
+    def _record(self, name, period, ok, latency):
+        with self._lock:
+            if ok:
+                lat = self.stats["latency"].setdefault(name, [])
+                lat.append(round(latency, 3))
+                del lat[:-MAX_LATENCY_SAMPLES]
+            per = self.stats["periods"].setdefault(period, {}).setdefault(name, {"ok": 0, "fail": 0})
+            per["ok" if ok else "fail"] += 1
+
+    def hedge_delay(self, name):
+        """Seconds to wait on `name` before starting the next source."""
+        with self._lock:
+            lat = list(self.stats["latency"].get(name, []))
+        if len(lat) < MIN_LATENCY_SAMPLES:
+            return self.default_delay
+        return _percentile(lat, self.hedge_percentile)
+
+    def order(self, arxiv_id):
+        """Source names ordered by past success for this paper's period."""
+        with self._lock:
+            per = self.stats["periods"].get(period_key(arxiv_id), {})
+            rank = {}
+            for i, (name, _) in enumerate(self.sources):
+                c = per.get(name, {"ok": 0, "fail": 0})
+                # Laplace-smoothed success rate; ties keep the configured order
+                rate = (c["ok"] + 1) / (c["ok"] + c["fail"] + 2)
+                rank[name] = (-rate, i)
+        return sorted((name for name, _ in self.sources), key=lambda n: rank[n])
+
+    def _run(self, name, fn, arxiv_id, period):
+        t0 = time.monotonic()
+        try:
+            body, refs, info = fn(arxiv_id)
+        except Exception as e:
+            logging.error(f"Source {name} raised for {arxiv_id}: {e}")
+            body, refs, info = None, None, None
+        ok = bool(body) and (self.validate is None or self.validate(body))
+        self._record(name, period, ok, time.monotonic() - t0)
+        return (body, refs, info) if ok else (None, None, None)
+
+    def fetch(self, arxiv_id):
+        """
+        Return (body, refs, source_name, info) from the first source that yields
+        valid content, or (None, None, None, None) if every source failed.
+        """
+        fns = dict(self.sources)
+        pending_names = self.order(arxiv_id)
+        period = period_key(arxiv_id)
+        pool = ThreadPoolExecutor(max_workers=len(pending_names) or 1)
+        running = {}
+
+        def launch():
+            name = pending_names.pop(0)
+            running[pool.submit(self._run, name, fns[name], arxiv_id, period)] = name
+            return name
+
+        try:
+            current = launch() if pending_names else None
+            while running:
+                timeout = self.hedge_delay(current) if pending_names else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    current = launch()
+                    logging.info(f"Hedging {arxiv_id}: slow source, also trying {current}")
+                    continue
+                for fut in done:
+                    name = running.pop(fut)
+                    body, refs, info = fut.result()
+                    if body:
+                        return body, refs, name, info
+                    logging.info(f"Source {name} failed for {arxiv_id}")
+                    if pending_names:
+                        current = launch()
+            return None, None, None, None
+        finally:
+            # Do not block on slower hedged requests that lost the race
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Stats are advisory: never let saving them discard a fetched body
+            try:
+                self.save_stats()
+            except OSError as e:
+                logging.warning(f"Could not save source stats {self.stats_path}: {e}")
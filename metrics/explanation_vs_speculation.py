@@ -1,4 +1,5 @@
-from api.api import chat, extract_score
+from api.api import chat_score, DEFAULT_MODEL
+from metrics.layout import build_prompt
 
 prompt_template = """
 Academic papers may suffer from conflating explanation with speculation., which mainly manifests in the following three forms: 
@@ -30,9 +31,9 @@ Paper content:
 {}
 """
 
-def eval_explanation_vs_speculation(text):
-    prompt = prompt_template.format(text)
-    return extract_score(chat(prompt))
+def eval_explanation_vs_speculation(text, model=DEFAULT_MODEL, samples=1, layout="rubric_first"):
+    prompt = build_prompt(prompt_template, text, layout)
+    return chat_score(prompt, model=model, samples=samples)
 
 if __name__ == '__main__':
     with open("data/papers/2601.10679/body.txt", "r") as f:
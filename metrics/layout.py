@@ -0,0 +1,19 @@
+# Prompt layouts. Every metric template ends with "Paper content:\n{}".
+#
+# rubric_first: the template as written (rubric, then paper).
+# paper_first:  the paper in a stable leading block, then the rubric, so the
+#               four metric calls for one paper share a long common prefix and
+#               providers with prefix caching can serve calls 2-4 from cache.
+#               Only effective when all metrics receive the same text (i.e.
+#               without per-metric compression or section selection).
+
+PAPER_MARKER = "Paper content:"
+LAYOUTS = ("rubric_first", "paper_first")
+
+def build_prompt(template, text, layout="rubric_first"):
+    if layout == "rubric_first":
+        return template.format(text)
+    if layout != "paper_first":
+        raise ValueError(f"Unknown prompt layout: {layout}")
+    rubric = template[:template.rindex(PAPER_MARKER)].strip()
+    return f"{PAPER_MARKER}\n{text}\n\n---\n\n{rubric}\n\nThe paper to evaluate is the one given above.\n"
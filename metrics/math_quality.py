@@ -1,7 +1,8 @@
 # Usage: in the root directory, run:
 # python -m metrics.math_quality
 
-from api.api import chat, extract_score
+from api.api import chat_score, DEFAULT_MODEL
+from metrics.layout import build_prompt
 
 prompt_template = """
 Academic papers may suffer from mathiness, which mainly manifests in the following eight forms: 
@@ -50,9 +51,9 @@ Paper content:
 {}
 """
 
-def eval_math_quality(text):
-    prompt = prompt_template.format(text)
-    return extract_score(chat(prompt))
+def eval_math_quality(text, model=DEFAULT_MODEL, samples=1, layout="rubric_first"):
+    prompt = build_prompt(prompt_template, text, layout)
+    return chat_score(prompt, model=model, samples=samples)
 
 if __name__ == '__main__':
     with open("data/papers/2601.10679/body.txt", "r") as f:
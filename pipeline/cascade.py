@@ -0,0 +1,70 @@
+# Cheap-model triage: score with a small model first and only ask the strong
+# model when the cheap score falls in the uncertain band or cannot be parsed.
+
+import json
+import os
+import threading
+
+DEFAULT_CHEAP_MODEL = "gemini-2.5-flash-lite"
+DEFAULT_STRONG_MODEL = "gemini-2.5-pro"
+# Inclusive score band (1-10 scale) in which the cheap model is not trusted
+DEFAULT_UNCERTAIN_BAND = (4, 7)
+
+
+class Cascade:
+    def __init__(self, cheap_model=DEFAULT_CHEAP_MODEL, strong_model=DEFAULT_STRONG_MODEL,
+                 band=DEFAULT_UNCERTAIN_BAND):
+        self.cheap_model = cheap_model
+        self.strong_model = strong_model
+        self.band = (float(band[0]), float(band[1]))
+        # metric -> {"total", "escalated", "uncertain", "unparsable"}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, metric, key):
+        with self._lock:
+            st = self.stats.setdefault(metric, {"total": 0, "escalated": 0, "uncertain": 0, "unparsable": 0})
+            st[key] += 1
+
+    def score(self, metric, eval_fn, text, **kwargs):
+        """
+        Score `text` with `eval_fn(text, model=..., **kwargs)`. Returns (score, model_used).
+        Only an unparsable cheap answer (ValueError from chat_score) escalates;
+        API errors propagate so they are not mistaken for uncertainty.
+        """
+        self._count(metric, "total")
+        try:
+            score = eval_fn(text, model=self.cheap_model, **kwargs)
+        except ValueError:
+            score = None
+        # Multi-sample scores come back as a summary dict (see api.summarize_scores)
+        value = score["score"] if isinstance(score, dict) else score
+
+        if score is None:
+            reason = "unparsable"
+        elif self.band[0] <= value <= self.band[1]:
+            reason = "uncertain"
+        else:
+            return score, self.cheap_model
+
+        self._count(metric, reason)
+        self._count(metric, "escalated")
+        return eval_fn(text, model=self.strong_model, **kwargs), self.strong_model
+
+    def summary(self):
+        with self._lock:
+            out = {
+                "cheap_model": self.cheap_model,
+                "strong_model": self.strong_model,
+                "uncertain_band": list(self.band),
+                "metrics": {},
+            }
+            for metric, st in self.stats.items():
+                rate = st["escalated"] / st["total"] if st["total"] else 0.0
+                out["metrics"][metric] = dict(st, escalation_rate=round(rate, 4))
+        return out
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
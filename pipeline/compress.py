@@ -0,0 +1,144 @@
+# Per-metric prompt compression: strip content of body.txt that a metric does
+# not need (display math, table dumps, captions, appendices) before scoring.
+# The prompt templates themselves are unchanged.
+
+import re
+import threading
+
+# Per-metric defaults. Values for math: "keep" | "collapse" | "drop".
+COMPRESSION = {
+    "empirical_clarity": {
+        "display_math": "collapse", "inline_math": "keep",
+        "tables": True, "captions": True, "appendix": False,
+    },
+    "explanation_vs_speculation": {
+        "display_math": "collapse", "inline_math": "keep",
+        "tables": False, "captions": False, "appendix": False,
+    },
+    "language_misuse": {
+        "display_math": "collapse", "inline_math": "collapse",
+        "tables": False, "captions": False, "appendix": False,
+    },
+    # Derivations are the evidence here, and proofs often live in the appendix
+    "math_quality": {
+        "display_math": "keep", "inline_math": "keep",
+        "tables": False, "captions": True, "appendix": True,
+    },
+}
+
+DISPLAY_MATH_RE = re.compile(r"\$\$(.+?)\$\$", re.DOTALL)
+INLINE_MATH_RE = re.compile(r"(?<!\$)\$(?!\$)([^$\n]+?)\$(?!\$)")
+CAPTION_RE = re.compile(r"^\s*(figure|fig\.|table)\s*[0-9IVX]+\s*[:.]", re.IGNORECASE)
+APPENDIX_HEAD_RE = re.compile(r"^#+\s*(appendix|appendices|supplementary|supplemental)\b", re.IGNORECASE)
+HEADING_RE = re.compile(r"^#+\s")
+# Table cells are mostly numbers like "85.3", "±0.2", "12%", "(3.1)"
+NUMERIC_CELL_RE = re.compile(r"^[-+±~<>()\[\]\d.,%×x*/\s]*\d[-+±~<>()\[\]\d.,%×x*/\s]*$")
+
+# Inline math shorter than this is kept even in "collapse" mode ($x$, $\alpha$...)
+INLINE_COLLAPSE_MIN_LEN = 40
+# A run of at least this many short lines, at least TABLE_NUMERIC_RATIO of
+# them numeric cells, is treated as a table dump. body.txt puts every text
+# node on its own line, so short lines alone are not enough.
+TABLE_RUN_MIN_LINES = 8
+TABLE_LINE_MAX_LEN = 40
+TABLE_NUMERIC_RATIO = 0.5
+
+# Tokenizer used for all token counts (budgets, stats, cost planning)
+TOKEN_ENCODING = "cl100k_base"
+_encoding = None
+
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        import tiktoken
+        _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+def _math(text, display_mode, inline_mode):
+    if display_mode == "drop":
+        text = DISPLAY_MATH_RE.sub("", text)
+    elif display_mode == "collapse":
+        text = DISPLAY_MATH_RE.sub("[display equation]", text)
+    if inline_mode == "drop":
+        text = INLINE_MATH_RE.sub("", text)
+    elif inline_mode == "collapse":
+        text = INLINE_MATH_RE.sub(
+            lambda m: "[math]" if len(m.group(1)) >= INLINE_COLLAPSE_MIN_LEN else m.group(0), text)
+    return text
+
+def _drop_appendix(lines):
+    for i, line in enumerate(lines):
+        if APPENDIX_HEAD_RE.match(line):
+            return lines[:i]
+    return lines
+
+def _drop_tables(lines):
+    out, run = [], []
+
+    def flush():
+        numeric = sum(1 for l in run if NUMERIC_CELL_RE.match(l.strip()))
+        if len(run) < TABLE_RUN_MIN_LINES or numeric < TABLE_NUMERIC_RATIO * len(run):
+            out.extend(run)
+        run.clear()
+
+    for line in lines:
+        s = line.strip()
+        if s and len(s) <= TABLE_LINE_MAX_LEN and not HEADING_RE.match(s) and not CAPTION_RE.match(s):
+            run.append(line)
+        else:
+            flush()
+            out.append(line)
+    flush()
+    return out
+
+def compress_text(text, config):
+    """Apply one compression config (see COMPRESSION) to a paper body."""
+    text = _math(text, config.get("display_math", "keep"), config.get("inline_math", "keep"))
+    lines = text.split("\n")
+    if not config.get("appendix", True):
+        lines = _drop_appendix(lines)
+    if not config.get("tables", True):
+        lines = _drop_tables(lines)
+    if not config.get("captions", True):
+        lines = [l for l in lines if not CAPTION_RE.match(l)]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+class Compressor:
+    """Compress paper text per metric and keep a running tally of token savings."""
+
+    def __init__(self, config=None, keep_tables=False, keep_appendix=False):
+        # `config` overrides the defaults key by key, per metric
+        merged = {name: dict(cfg) for name, cfg in COMPRESSION.items()}
+        for name, cfg in (config or {}).items():
+            merged.setdefault(name, {}).update(cfg)
+        self.config = {}
+        for name, cfg in merged.items():
+            if keep_tables:
+                cfg["tables"] = True
+            if keep_appendix:
+                cfg["appendix"] = True
+            self.config[name] = cfg
+        # metric -> {"before": tokens, "after": tokens}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def compress(self, metric, text):
+        """Return (compressed_text, {"before": n, "after": m}) for one metric."""
+        cfg = self.config.get(metric)
+        out = compress_text(text, cfg) if cfg else text
+        saving = {"before": count_tokens(text), "after": count_tokens(out)}
+        with self._lock:
+            tot = self.totals.setdefault(metric, {"before": 0, "after": 0})
+            tot["before"] += saving["before"]
+            tot["after"] += saving["after"]
+        return out, saving
+
+    def summary(self):
+        out = {}
+        with self._lock:
+            totals = {metric: dict(tot) for metric, tot in self.totals.items()}
+        for metric, tot in totals.items():
+            saved = 1 - tot["after"] / tot["before"] if tot["before"] else 0.0
+            out[metric] = dict(tot, saved_ratio=round(saved, 4))
+        return out
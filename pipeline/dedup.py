@@ -0,0 +1,31 @@
+# Cross-listed papers: a paper in both math.* and cs.AI can be sampled for
+# both domains. Collapse the sample to one canonical record per paper so it
+# is downloaded and scored once, then attach the result to every domain.
+
+
+def paper_domains(index, arxiv_id):
+    """All domains of a CompactIndex that list arxiv_id."""
+    return [d for d in index.domains() if arxiv_id in index.ids(d)]
+
+
+def canonical_papers(sampled, index=None):
+    """
+    [(domain, arxiv_id)] -> [{"arxiv_id", "sampled_domains", "domains"}],
+    one record per paper in first-seen order. "sampled_domains" are the
+    domains the paper was drawn for; "domains" adds every other domain of
+    `index` that lists it.
+    """
+    records = {}
+    for domain, arxiv_id in sampled:
+        rec = records.setdefault(arxiv_id, {"arxiv_id": arxiv_id, "sampled_domains": [], "domains": []})
+        if domain not in rec["sampled_domains"]:
+            rec["sampled_domains"].append(domain)
+    for rec in records.values():
+        extra = paper_domains(index, rec["arxiv_id"]) if index is not None else []
+        rec["domains"] = rec["sampled_domains"] + [d for d in extra if d not in rec["sampled_domains"]]
+    return list(records.values())
+
+
+def domain_pairs(papers):
+    """Canonical records -> the (domain, arxiv_id) pairs they were sampled as."""
+    return [(d, p["arxiv_id"]) for p in papers for d in p["sampled_domains"]]
@@ -8,116 +8,514 @@ from metrics.explanation_vs_speculation import eval_explanation_vs_speculation
 from metrics.language_misuse import eval_language_misuse
 from metrics.math_quality import eval_math_quality
 
-from dataset.fetch_paper import ar5iv_text_and_refs
+from dataset.fetch_paper import (fetch_paper_with_info, save_paper, refresh_paper, load_fetch_info,
+                                 content_hash, _validate_paper_content)
+from dataset.fetch_index import fetch_metadata_by_ids
+from dataset.compact_index import load_index, PaperStatus
+from dataset.extract_worker import load_quarantine
+from pipeline.cascade import Cascade, DEFAULT_CHEAP_MODEL, DEFAULT_STRONG_MODEL, DEFAULT_UNCERTAIN_BAND
+from pipeline.compress import Compressor, count_tokens
+from pipeline.sections import SectionSelector, build_section_index, DEFAULT_SECTION_BUDGET
+from pipeline.streaming import Stage, StagedPipeline
+from pipeline.shards import parse_shard, select_shard, write_manifest
+from pipeline.dedup import canonical_papers, domain_pairs
+from pipeline.sequential import SequentialSampler, DEFAULT_BATCH_SIZE, DEFAULT_TARGET_CI, DEFAULT_MIN_PAPERS
+from pipeline.planner import Planner, load_throughput, load_escalation_rates
+from api.api import DEFAULT_MODEL, SUPPORTS_N, usage_summary
+from metrics.layout import LAYOUTS
 
 import argparse
 import json
 import os
 import random
-import time
-import tiktoken
 
+RESULT_SAVE_DIR = "results"
+PAPERS_DIR = "data/papers"
 
+# 指标名 -> 评估函数；结果中保存为 f"{name}_score"
+METRICS = {
+    "empirical_clarity": eval_empirical_clarity,
+    "explanation_vs_speculation": eval_explanation_vs_speculation,
+    "language_misuse": eval_language_misuse,
+    "math_quality": eval_math_quality,
+}
 
-if __name__ == '__main__':
+
+def paper_on_disk(arxiv_id, status=None):
+    """
+    论文正文是否已下载。已下载位命中即视为已下载，不访问文件系统；未命中时
+    再检查 body.txt（只针对待下载的抽样论文），以发现由 dataset.fetch_paper
+    单独下载的论文并补记位图。位图过期（论文目录被删除）由预处理阶段发现。
+    """
+    if status is not None and status.has("downloaded", arxiv_id):
+        return True
+    exists = os.path.exists(os.path.join(PAPERS_DIR, arxiv_id, "body.txt"))
+    if exists and status is not None:
+        status.mark("downloaded", arxiv_id)
+    return exists
+
+
+def download_paper(arxiv_id, refresh=False, latest_version=None, status=None):
+    """
+    下载论文正文与引用到 data/papers/{arxiv_id}。返回状态：
+    "downloaded" 新下载；"skipped" 已下载且未刷新；
+    refresh=True 时对已下载论文发条件请求，返回 "changed" 或 "unchanged"。
+    """
+    if paper_on_disk(arxiv_id, status):
+        if refresh:
+            return refresh_paper(arxiv_id, latest_version, PAPERS_DIR)
+        print(f"[SKIP] 论文 {arxiv_id} 已下载")
+        return "skipped"
+    body, refs, info = fetch_paper_with_info(arxiv_id)
+    save_paper(arxiv_id, body, refs, info, PAPERS_DIR)
+    return "downloaded"
+
+
+def load_result(domain, arxiv_id, result_dir=RESULT_SAVE_DIR):
+    path = os.path.join(result_dir, f"eval_results_{domain}_{arxiv_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resume_result(paper, status, result_dir=RESULT_SAVE_DIR):
+    """
+    --resume：论文在所有抽样领域的已评估位均已置位时返回已有结果（不再下载、
+    评估），否则返回 None。结果文件已不存在时清除对应的位。
+    """
+    arxiv_id = paper["arxiv_id"]
+    if not all(status.has("scored", arxiv_id, d) for d in paper["sampled_domains"]):
+        return None
+    result = load_any_result(arxiv_id, paper["sampled_domains"], result_dir)
+    if result is None:
+        for domain in paper["sampled_domains"]:
+            status.unmark("scored", arxiv_id, domain)
+        return None
+    return dict(result, sampled_domains=paper["sampled_domains"], domains=paper["domains"])
+
+
+def load_any_result(arxiv_id, domains, result_dir=RESULT_SAVE_DIR):
+    """论文在任一领域下的已有结果（跨领域复用），没有则返回 None"""
+    for domain in domains:
+        result = load_result(domain, arxiv_id, result_dir)
+        if result is not None:
+            return result
+    return None
+
+
+def prepare_prompts(paper_text, compressor=None, selector=None):
+    """
+    为每个指标准备输入文本，返回 (texts, prompt_info)，键为指标名。
+    prompt_info 记录压缩前后的 token 数以及所选章节。
+    """
+    texts, prompt_info = {}, {}
+    # 不压缩时各指标共用同一份章节索引
+    sections = build_section_index(paper_text) if selector is not None and compressor is None else None
+    for name in METRICS:
+        text, info = paper_text, {}
+        if compressor is not None:
+            text, info = compressor.compress(name, text)
+        if selector is not None:
+            text, info["sections"] = selector.select(name, text, sections)
+            info["selected"] = count_tokens(text)
+        if info:
+            prompt_info[name] = info
+        texts[name] = text
+    return texts, prompt_info
+
+
+def score_prompts(texts, model=DEFAULT_MODEL, cascade=None, samples=1, layout="rubric_first"):
+    """
+    对每个指标的输入文本打分，返回 (scores, models)。
+    samples > 1 时每个分数为 api.summarize_scores 的统计字典（均值、中位数、离散度）。
+    """
+    scores, models = {}, {}
+    for name, eval_fn in METRICS.items():
+        if cascade is not None:
+            scores[name], models[name] = cascade.score(name, eval_fn, texts[name], samples=samples, layout=layout)
+        else:
+            scores[name], models[name] = eval_fn(texts[name], model=model, samples=samples, layout=layout), model
+    return scores, models
+
+
+def score_paper(paper_text, model=DEFAULT_MODEL, cascade=None, compressor=None, selector=None, samples=1,
+                layout="rubric_first"):
+    """对单篇论文计算全部指标，返回 (scores, models, prompt_info)，键为指标名"""
+    texts, prompt_info = prepare_prompts(paper_text, compressor, selector)
+    scores, models = score_prompts(texts, model, cascade, samples, layout)
+    return scores, models, prompt_info
+
+
+def save_result(eval_results, result_dir=RESULT_SAVE_DIR):
+    os.makedirs(result_dir, exist_ok=True)
+    result_filename = f"eval_results_{eval_results['domain']}_{eval_results['arxiv_id']}.json"
+    result_path = os.path.join(result_dir, result_filename)
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(eval_results, f, ensure_ascii=False, indent=2)
+    return result_path
+
+
+def save_paper_results(eval_results, paper, result_dir=RESULT_SAVE_DIR):
+    """
+    同一篇论文只评估一次，结果按抽样领域各写一份 eval_results_{domain}_{id}.json，
+    并记录论文所属的全部领域（汇总时按 arxiv_id 去重）。
+    """
+    paths = []
+    for domain in paper["sampled_domains"]:
+        paths.append(save_result(dict(eval_results, domain=domain, sampled_domains=paper["sampled_domains"],
+                                      domains=paper["domains"]), result_dir))
+    return paths
+
+
+def plan_run(args, papers, compressor=None, selector=None):
+    """只估算 token、费用与耗时，不调用 LLM；结果写入 plan_{year}.json"""
+    models = [args.cheap_model, args.strong_model] if args.cascade else [args.model]
+    prices = None
+    if args.prices:
+        with open(args.prices, "r", encoding="utf-8") as f:
+            prices = json.load(f)
+    planner = Planner(models,
+                      escalation_rates=load_escalation_rates(args.result_dir, args.year) if args.cascade else None,
+                      throughput=load_throughput(args.result_dir, args.year), prices=prices,
+                      samples=args.samples, supports_n=SUPPORTS_N, layout=args.prompt_layout)
+    prepare = None
+    if compressor is not None or selector is not None:
+        prepare = lambda body: prepare_prompts(body, compressor, selector)
+    plan = planner.plan(papers, workers=args.score_workers, prepare=prepare)
+
+    os.makedirs(args.result_dir, exist_ok=True)
+    with open(os.path.join(args.result_dir, f"plan_{args.year}.json"), "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    print(f"[PLAN] {plan['papers']} 篇论文, 已下载 {plan['downloaded']} 篇"
+          + ("（其余按已下载论文的平均长度估算）" if plan["not_downloaded"] else ""))
+    for name, n in plan["mean_text_tokens"].items():
+        print(f"[PLAN] {name}: 平均正文 {n} tokens + 模板 {plan['template_tokens'][name]} tokens")
+    for model, u in plan["models"].items():
+        measured = "实测" if model in plan["measured_throughput"] else "默认值"
+        cost = f"${u['cost']:.2f}" if u["cost"] is not None else "未知价格"
+        print(f"[PLAN] {model}: {u['calls']} 次调用, 输入 {u['input_tokens']} / 输出 {u['output_tokens']} tokens, "
+              f"{cost}, 调用耗时 {u['seconds']}s（吞吐量: {measured}）")
+    total = f"${plan['cost_usd']:.2f}" if plan["cost_usd"] is not None else "未知（请用 --prices 提供价格）"
+    print(f"[PLAN] 总计 {plan['input_tokens'] + plan['output_tokens']} tokens, 费用 {total}, "
+          f"{args.score_workers} 并发下预计 {plan['wall_seconds'] / 60:.1f} 分钟")
+    for o in plan["overflow"]:
+        print(f"[WARN] 论文 {o['arxiv_id']} 的 {o['metric']} 提示词 {o['prompt_tokens']} tokens "
+              f"超出 {o['model']} 上下文 {o['context_window']}，可考虑 --compress 或 --select_sections")
+    return plan
+
+
+def run_adaptive(pipeline, sampler, index, status, args):
+    """
+    自适应序贯抽样：每轮从各领域的种子抽样列表中再取 batch_size 篇评估，
+    更新各领域/各指标的置信区间，全部收敛、样本取完或超出调用预算时停止。
+    返回本次评估的结果（每篇论文一条）。
+    """
+    done = {}
+    rnd = 0
+    while not sampler.finished():
+        rnd += 1
+        todo = []
+        for paper in canonical_papers(sampler.next_batch(), index):
+            prior = done.get(paper["arxiv_id"])
+            if prior is None:
+                resumed = resume_result(paper, status, args.result_dir) if args.resume else None
+                if resumed is None:
+                    todo.append(paper)
+                else:
+                    done[paper["arxiv_id"]] = resumed
+                    sampler.add(resumed, paper["sampled_domains"])
+                continue
+            # 前几轮已作为另一领域的样本评估过：直接复用，结果挂到新领域
+            new_domains = [d for d in paper["sampled_domains"] if d not in prior["sampled_domains"]]
+            merged = dict(paper, sampled_domains=prior["sampled_domains"] + new_domains)
+            save_paper_results(prior, merged, args.result_dir)
+            for domain in new_domains:
+                status.mark("scored", paper["arxiv_id"], domain)
+            done[paper["arxiv_id"]] = dict(prior, sampled_domains=merged["sampled_domains"])
+            sampler.add(prior, new_domains)
+        for r in pipeline.run(todo):
+            done[r["arxiv_id"]] = r
+            sampler.add(r, r["sampled_domains"])
+
+        calls = sum(u["calls"] for u in usage_summary().values())
+        sampler.record_round(round=rnd, llm_calls=calls)
+        for domain, metrics in sampler.intervals().items():
+            state = "已收敛" if sampler.converged(domain) else f"已取 {sampler.taken[domain]}/{len(sampler.samples[domain])}"
+            widths = ", ".join(f"{m} {ci['mean']}±{ci['width'] / 2:.2f}" if ci["width"] is not None else f"{m} n={ci['n']}"
+                               for m, ci in metrics.items())
+            print(f"[ADAPTIVE] 第 {rnd} 轮 {domain} ({state}): {widths}")
+        if args.max_llm_calls is not None and calls >= args.max_llm_calls:
+            print(f"[ADAPTIVE] 已达到调用预算 {args.max_llm_calls}，停止抽样")
+            break
+    if sampler.separated():
+        print("[ADAPTIVE] 各指标上两个领域的差异均已显著")
+    return list(done.values())
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser(description="Start evaluation pipeline.")
     ap.add_argument("year", type=int, help="Year, e.g., 2023")
-    ap.add_argument("--num_sample", type=int, default=10, help="Number of samples")
+    ap.add_argument("--num_sample", type=int, default=10, help="Number of samples (per-domain cap with --adaptive)")
     ap.add_argument("--seed", type=int, default=None, help="Random seed")
-    args = ap.parse_args()
+    ap.add_argument("--model", type=str, default=DEFAULT_MODEL, help="Scoring model (without --cascade)")
+    ap.add_argument("--cascade", action="store_true", help="Score with a cheap model, escalate uncertain/unparsable scores")
+    ap.add_argument("--cheap_model", type=str, default=DEFAULT_CHEAP_MODEL, help="First-pass model for --cascade")
+    ap.add_argument("--strong_model", type=str, default=DEFAULT_STRONG_MODEL, help="Escalation model for --cascade")
+    ap.add_argument("--uncertain_band", type=float, nargs=2, default=list(DEFAULT_UNCERTAIN_BAND),
+                    metavar=("LO", "HI"), help="Inclusive cheap-score band that triggers escalation")
+    ap.add_argument("--compress", action="store_true", help="Strip low-signal content per metric before scoring")
+    ap.add_argument("--compress_config", type=str, default=None, help="JSON file overriding per-metric compression settings")
+    ap.add_argument("--keep_tables", action="store_true", help="With --compress, never drop table dumps")
+    ap.add_argument("--keep_appendix", action="store_true", help="With --compress, never drop appendices")
+    ap.add_argument("--select_sections", action="store_true", help="Build each metric's prompt from its most relevant sections")
+    ap.add_argument("--section_budget", type=int, default=DEFAULT_SECTION_BUDGET, help="Token budget per prompt for --select_sections")
+    ap.add_argument("--fetch_workers", type=int, default=2, help="Concurrent downloads")
+    ap.add_argument("--prep_workers", type=int, default=1, help="Concurrent validate/compress/select workers")
+    ap.add_argument("--score_workers", type=int, default=4, help="Concurrent papers being scored by the LLM")
+    ap.add_argument("--queue_size", type=int, default=8, help="Max papers waiting between two stages")
+    ap.add_argument("--shard", type=parse_shard, default=(0, 1), help="Only run shard i of N, e.g. 2/8 (see pipeline.shards)")
+    ap.add_argument("--result_dir", type=str, default=RESULT_SAVE_DIR, help="Where results and the shard manifest are written")
+    ap.add_argument("--samples", type=int, default=1, help="Score samples per metric per request; stores mean/median/spread")
+    ap.add_argument("--prompt_layout", choices=LAYOUTS, default="rubric_first",
+                    help="paper_first puts the paper before the rubric so providers can cache the shared prefix")
+    ap.add_argument("--refresh", action="store_true",
+                    help="Conditionally re-fetch downloaded papers; re-score only those whose content changed")
+    ap.add_argument("--plan", action="store_true",
+                    help="Dry run: estimate tokens, cost and time of scoring the sample, then exit")
+    ap.add_argument("--prices", type=str, default=None,
+                    help="JSON file of USD per 1M tokens, {model: {\"input\": x, \"output\": y}}, for --plan")
+    ap.add_argument("--resume", action="store_true",
+                    help="Reuse saved results of papers whose scored bit is set for every domain they were sampled for")
+    ap.add_argument("--rescan_status", action="store_true",
+                    help="Rebuild the status bitmaps of the whole index from data/papers and --result_dir")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="Score the seeded sample in batches and stop each domain once its CIs are narrow enough")
+    ap.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE, help="Papers per domain per round for --adaptive")
+    ap.add_argument("--target_ci", type=float, default=DEFAULT_TARGET_CI,
+                    help="Stop a domain when every metric's 95%% CI is at most this wide (score points)")
+    ap.add_argument("--min_papers", type=int, default=DEFAULT_MIN_PAPERS, help="Never stop a domain with fewer scored papers")
+    ap.add_argument("--stop_when_separated", action="store_true",
+                    help="With --adaptive, also stop once every metric's math - cs.ai difference CI excludes 0")
+    ap.add_argument("--max_llm_calls", type=int, default=None, help="With --adaptive, stop after this many LLM calls")
+    args = ap.parse_args(argv)
+    if args.adaptive and args.shard[1] > 1:
+        ap.error("--adaptive decides when to stop from all scores so far and cannot be sharded")
     num_sample = args.num_sample
     year = args.year
+    cascade = Cascade(args.cheap_model, args.strong_model, args.uncertain_band) if args.cascade else None
+    compressor = None
+    if args.compress:
+        compress_config = None
+        if args.compress_config:
+            with open(args.compress_config, "r", encoding="utf-8") as f:
+                compress_config = json.load(f)
+        compressor = Compressor(compress_config, keep_tables=args.keep_tables, keep_appendix=args.keep_appendix)
+    selector = SectionSelector(args.section_budget) if args.select_sections else None
+    if args.prompt_layout == "paper_first" and (compressor is not None or selector is not None):
+        print("[WARN] --compress/--select_sections 使各指标输入不同，paper_first 无法共享前缀缓存")
 
     if args.seed is not None:
         random.seed(args.seed)
 
-    indices = json.load(open(f"data/indices/indices_{year}.json", "r", encoding="utf-8"))#是否需要修改？
-    math_list = random.sample(indices["math"], num_sample)
-    csai_list = random.sample(indices["cs.ai"], num_sample)
-
-    
-    # 3. 批量下载math和cs.ai领域的论文
-    downloaded_papers = []  # 记录成功下载的论文（领域, arxiv_id）
-    # 下载math领域
-    for arxiv_id in math_list:
-        if os.path.exists(f"data/papers/{arxiv_id}"):
-            print(f"[SKIP] 论文 {arxiv_id} 已下载")
-            downloaded_papers.append(("cs.ai", arxiv_id))
-            continue
-        try:            
-            body, refs = ar5iv_text_and_refs(arxiv_id)
-            os.makedirs(f"data/papers/{arxiv_id}", exist_ok=True)
-            with open(f"data/papers/{arxiv_id}/body.txt", "w", encoding="utf-8") as f:
-                f.write(body)
-            with open(f"data/papers/{arxiv_id}/ref.json", "w", encoding="utf-8") as f:
-                json.dump(refs, f, ensure_ascii=False, indent=2)
-            downloaded_papers.append(("math", arxiv_id))
-        except Exception as e:
-            print("failed:", arxiv_id, e)
-        time.sleep(2)
-        
-    for arxiv_id in csai_list:
-        if os.path.exists(f"data/papers/{arxiv_id}"):
-            print(f"[SKIP] 论文 {arxiv_id} 已下载")
-            downloaded_papers.append(("cs.ai", arxiv_id))
-            continue
-        try:
-            body, refs = ar5iv_text_and_refs(arxiv_id)
-            os.makedirs(f"data/papers/{arxiv_id}", exist_ok=True)
-            with open(f"data/papers/{arxiv_id}/body.txt", "w", encoding="utf-8") as f:
-                f.write(body)
-            with open(f"data/papers/{arxiv_id}/ref.json", "w", encoding="utf-8") as f:
-                json.dump(refs, f, ensure_ascii=False, indent=2)
-            downloaded_papers.append(("cs.ai", arxiv_id))
-        except Exception as e:
-            print("failed:", arxiv_id, e)
-        time.sleep(2)
-    
-    # 无成功下载的论文则终止流程
-    if not downloaded_papers:
-        print("[ERROR] 无论文下载成功，终止评估流程")
-        exit(1)
-        
-    for domain, arxiv_id in downloaded_papers:
-        body_path = os.path.join("data/papers", arxiv_id, "body.txt")
+    # 紧凑索引（内存映射、二分查找），由 indices_{year}.json 自动生成
+    index = load_index(year)
+    # 已下载/已校验/已评估状态位图：命中时跳过下载、校验（--resume 时跳过评估）
+    status = PaperStatus(index, year)
+    if args.rescan_status:
+        status.scan(PAPERS_DIR, args.result_dir)
+    stale_status = status.missing()
+    math_list = random.sample(index.ids("math"), num_sample)
+    csai_list = random.sample(index.ids("cs.ai"), num_sample)
+    sampled = [("math", aid) for aid in math_list] + [("cs.ai", aid) for aid in csai_list]
+    # 所有分片使用相同的种子抽样，再按 arxiv_id 的稳定哈希各取一份
+    papers = select_shard(sampled, args.shard)
+    if args.shard[1] > 1:
+        print(f"[SHARD] 分片 {args.shard[0]}/{args.shard[1]}: {len(papers)}/{len(sampled)} 篇")
+    # 交叉列出的论文可能同时被两个领域抽中：合并为一条记录，只下载、评估一次
+    unique = canonical_papers(papers, index)
+    if len(unique) < len(papers) and not args.adaptive:
+        print(f"[DEDUP] {len(papers)} 个抽样中有 {len(papers) - len(unique)} 个重复论文，实际评估 {len(unique)} 篇")
+    if stale_status and not args.rescan_status:
+        # 位图缺失或早于索引（首次运行、重新抓取索引后）：只按文件系统核对抽样论文
+        status.sync(papers, PAPERS_DIR, args.result_dir)
+
+    if args.plan:
+        plan_run(args, [(p["sampled_domains"][0], p["arxiv_id"]) for p in unique], compressor, selector)
+        return
+
+    # 刷新模式：先通过 arXiv API 批量获取已下载论文的最新版本号，版本未变的论文不再发请求
+    latest_versions = {}
+    if args.refresh:
+        on_disk = [p["arxiv_id"] for p in unique if paper_on_disk(p["arxiv_id"], status)]
+        if on_disk:
+            latest_versions = {aid: e.get("version") for aid, e in fetch_metadata_by_ids(on_disk).items()}
+
+    # 下载 -> 校验/预处理 -> 打分 三个阶段流式并行，阶段之间用有界队列连接
+    def fetch_stage(paper):
+        arxiv_id = paper["arxiv_id"]
+        # 请求间隔由 api.ratelimit 的共享预算控制
+        fetched = download_paper(arxiv_id, args.refresh, latest_versions.get(arxiv_id), status)
+        status.mark("downloaded", arxiv_id)
+        if fetched in ("downloaded", "changed"):
+            status.unmark("validated", arxiv_id)
+        if args.refresh and fetched != "skipped":
+            print(f"[REFRESH] 论文 {arxiv_id}: {fetched}")
+        return paper, fetched
+
+    def prep_stage(item):
+        paper, fetched = item
+        arxiv_id = paper["arxiv_id"]
+        if fetched == "unchanged":
+            # 内容未变且在任一领域下已有对应结果，则直接复用，不再调用 LLM
+            old = load_any_result(arxiv_id, paper["domains"], args.result_dir)
+            info = load_fetch_info(arxiv_id, PAPERS_DIR) or {}
+            if old is not None and old.get("content_hash") == info.get("content_hash"):
+                return paper, None, old
+        body_path = os.path.join(PAPERS_DIR, arxiv_id, "body.txt")
         if not os.path.exists(body_path):
-            print(f"[SKIP] 论文 {arxiv_id} 正文文件缺失，跳过评估")
-            continue
-        
-        try:
-            print(f"[EVAL] 正在评估 {domain} 领域论文 {arxiv_id}...")
-            with open(body_path, "r", encoding="utf-8") as f:
-                paper_text = f.read()
-            
-            # paper_text_truncated = truncate_text_for_llm(paper_text)
-            score_empirical = eval_empirical_clarity(paper_text)
-            score_explanation = eval_explanation_vs_speculation(paper_text)
-            score_language = eval_language_misuse(paper_text)
-            score_math = eval_math_quality(paper_text)
-            
-            # 3. 收集单篇论文结果（自动释放paper_text内存）
-            eval_results = {
-                "arxiv_id": arxiv_id,
-                "domain": domain,
-                "year": year,
-                "empirical_clarity_score": score_empirical,
-                "explanation_vs_speculation_score": score_explanation,
-                "language_misuse_score": score_language,
-                "math_quality_score": score_math
-            }
-
-            RESULT_SAVE_DIR = "results"
-            os.makedirs(RESULT_SAVE_DIR, exist_ok=True)
-            result_filename = f"eval_results_{domain}_{arxiv_id}.json"
-            result_path = os.path.join(RESULT_SAVE_DIR, result_filename)
-            with open(result_path, "w", encoding="utf-8") as f:
-                json.dump(eval_results, f, ensure_ascii=False, indent=2)
-
-            print(f"[SUCCESS] 论文 {arxiv_id} 评估完成")
-
-        except Exception as e:
-            print(f"[FAIL] 论文 {arxiv_id} 评估失败: {str(e)}")
-            continue
-    
+            if fetched != "skipped":
+                print(f"[SKIP] 论文 {arxiv_id} 正文文件缺失，跳过评估")
+                return None
+            # 位图记录已下载，但论文目录已被删除：清除过期的位并重新下载
+            print(f"[STALE] 论文 {arxiv_id} 正文文件缺失，重新下载")
+            status.unmark("downloaded", arxiv_id)
+            status.unmark("validated", arxiv_id)
+            fetched = download_paper(arxiv_id)
+            status.mark("downloaded", arxiv_id)
+        with open(body_path, "r", encoding="utf-8") as f:
+            paper_text = f.read()
+        # 已校验位只对未重新下载的正文有效
+        if not (fetched == "skipped" and status.has("validated", arxiv_id)):
+            if not _validate_paper_content(paper_text):
+                status.unmark("validated", arxiv_id)
+                print(f"[SKIP] 论文 {arxiv_id} 正文未通过校验，跳过评估")
+                return None
+            status.mark("validated", arxiv_id)
+        texts, prompt_info = prepare_prompts(paper_text, compressor, selector)
+        return paper, texts, {"prompt_info": prompt_info, "content_hash": content_hash(paper_text)}
+
+    def score_stage(item):
+        paper, texts, extra = item
+        arxiv_id = paper["arxiv_id"]
+        if texts is None:
+            print(f"[SKIP] 论文 {arxiv_id} 内容未变化，复用已有结果")
+            save_paper_results(extra, paper, args.result_dir)
+            for domain in paper["sampled_domains"]:
+                status.mark("scored", arxiv_id, domain)
+            return dict(extra, sampled_domains=paper["sampled_domains"], domains=paper["domains"])
+        prompt_info = extra["prompt_info"]
+        print(f"[EVAL] 正在评估 {'/'.join(paper['domains'])} 领域论文 {arxiv_id}...")
+        scores, models = score_prompts(texts, model=args.model, cascade=cascade, samples=args.samples,
+                                       layout=args.prompt_layout)
+
+        # 收集单篇论文结果
+        eval_results = {
+            "arxiv_id": arxiv_id,
+            "domain": paper["sampled_domains"][0],
+            "sampled_domains": paper["sampled_domains"],
+            "domains": paper["domains"],
+            "year": year,
+            "content_hash": extra["content_hash"],
+            "version": (load_fetch_info(arxiv_id, PAPERS_DIR) or {}).get("version"),
+        }
+        for name, score in scores.items():
+            if isinstance(score, dict):
+                # 多次采样：主分数取均值，统计量另存
+                eval_results[f"{name}_score"] = score["score"]
+                eval_results.setdefault("score_samples", {})[name] = score
+            else:
+                eval_results[f"{name}_score"] = score
+        eval_results["models"] = models
+        if prompt_info:
+            eval_results["prompt_tokens"] = prompt_info
+        save_paper_results(eval_results, paper, args.result_dir)
+        for domain in paper["sampled_domains"]:
+            status.mark("scored", arxiv_id, domain)
+        print(f"[SUCCESS] 论文 {arxiv_id} 评估完成")
+        return eval_results
+
+    def on_error(stage_name, item, e):
+        paper = item if stage_name == "fetch" else item[0]
+        if stage_name == "fetch":
+            print("failed:", paper["arxiv_id"], e)
+        else:
+            print(f"[FAIL] 论文 {paper['arxiv_id']} 评估失败: {str(e)}")
+
+    pipeline = StagedPipeline([
+        Stage("fetch", fetch_stage, args.fetch_workers),
+        Stage("prepare", prep_stage, args.prep_workers),
+        Stage("score", score_stage, args.score_workers),
+    ], queue_size=args.queue_size, on_error=on_error)
+    if args.adaptive:
+        sampler = SequentialSampler({"math": math_list, "cs.ai": csai_list}, METRICS, args.batch_size,
+                                    args.target_ci, args.min_papers, args.stop_when_separated)
+        evaluated = run_adaptive(pipeline, sampler, index, status, args)
+        # 清单只记录实际取用的抽样前缀
+        sampled = papers = sampler.consumed()
+        with open(os.path.join(args.result_dir, f"sequential_{year}.json"), "w", encoding="utf-8") as f:
+            json.dump(sampler.summary(), f, ensure_ascii=False, indent=2)
+    else:
+        evaluated, todo = [], unique
+        if args.resume:
+            todo = []
+            for paper in unique:
+                resumed = resume_result(paper, status, args.result_dir)
+                if resumed is None:
+                    todo.append(paper)
+                else:
+                    evaluated.append(resumed)
+            if evaluated:
+                print(f"[RESUME] {len(evaluated)} 篇论文已评估，复用已有结果")
+        evaluated += pipeline.run(todo)
+
+    status.save()
+
+    summary = pipeline.summary()
+    for name, st in summary["stages"].items():
+        print(f"[STAGE] {name}: {st['processed']} 篇, 失败 {st['failed']}, 忙碌 {st['busy_seconds']}s ({st['workers']} workers)")
+    print(f"[STAGE] 总耗时 {summary['wall_time']}s")
+
+    # 超出内存/时间限制的页面已被隔离，后续运行跳过（见 dataset.extract_worker）
+    run_ids = {p["arxiv_id"] for p in unique}
+    quarantined = [e for e in load_quarantine().values() if e["arxiv_id"] in run_ids]
+    for e in quarantined:
+        print(f"[QUARANTINE] 论文 {e['arxiv_id']} ({e['source']}): {e['reason']} {e['detail']}")
+
+    scored = domain_pairs(evaluated)
+    failed = sorted(set(papers) - set(scored))
+    write_manifest(args.result_dir, year, args.shard, sampled, papers, scored, failed,
+                   extra={"seed": args.seed, "num_sample": num_sample,
+                          "quarantined": sorted({e["arxiv_id"] for e in quarantined})})
+
+    # 无成功评估的论文则以错误码退出
+    if not evaluated:
+        print("[ERROR] 无论文评估成功")
+        exit(1)
+
+    if cascade is not None:
+        stats_path = os.path.join(args.result_dir, f"cascade_stats_{year}.json")
+        cascade.save(stats_path)
+        for name, st in cascade.summary()["metrics"].items():
+            print(f"[CASCADE] {name}: 升级率 {st['escalation_rate']:.2%} ({st['escalated']}/{st['total']})")
+
+    if compressor is not None:
+        stats_path = os.path.join(args.result_dir, f"compression_stats_{year}.json")
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(compressor.summary(), f, ensure_ascii=False, indent=2)
+        for name, st in compressor.summary().items():
+            print(f"[COMPRESS] {name}: {st['before']} -> {st['after']} tokens (节省 {st['saved_ratio']:.2%})")
+
+    usage = usage_summary()
+    with open(os.path.join(args.result_dir, f"usage_{year}.json"), "w", encoding="utf-8") as f:
+        json.dump(usage, f, ensure_ascii=False, indent=2)
+    for model_name, u in usage.items():
+        print(f"[USAGE] {model_name}: {u['calls']} 次调用, prompt {u['prompt_tokens']} tokens, "
+              f"缓存命中 {u['cached_tokens']} ({u['cached_ratio']:.2%})")
+
     print(f"\n[FINISH] 评估流程完成！")
-    print(f"- 结果已保存至: {RESULT_SAVE_DIR}")
+    print(f"- 结果已保存至: {args.result_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# Dry-run planner for get_metrics: estimate tokens, cost and wall-clock time
+# of scoring a paper sample before any LLM call is made.
+#
+# Body token counts are cached in each paper's fetch.json ("body_tokens");
+# save_paper rewrites fetch.json when the body changes, which drops the
+# cached count. Throughput (seconds and completion tokens per call) comes
+# from the usage_{year}.json of earlier runs, with defaults otherwise.
+
+import glob
+import json
+import os
+
+from dataset.fetch_paper import PAPERS_DIR, content_hash, load_fetch_info, save_paper_info
+from metrics import empirical_clarity, explanation_vs_speculation, language_misuse, math_quality
+from metrics.layout import build_prompt
+from pipeline.compress import TOKEN_ENCODING, count_tokens
+
+TEMPLATES = {
+    "empirical_clarity": empirical_clarity.prompt_template,
+    "explanation_vs_speculation": explanation_vs_speculation.prompt_template,
+    "language_misuse": language_misuse.prompt_template,
+    "math_quality": math_quality.prompt_template,
+}
+
+# USD per 1M tokens (list prices); override with a JSON file of the same shape
+MODEL_PRICES = {
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00},
+}
+CONTEXT_WINDOWS = {
+    "gemini-2.5-flash": 1048576,
+    "gemini-2.5-flash-lite": 1048576,
+    "gemini-2.5-pro": 1048576,
+}
+DEFAULT_CONTEXT_WINDOW = 128000
+# Used until a usage_{year}.json has measured them
+DEFAULT_SECONDS_PER_CALL = 30.0
+DEFAULT_COMPLETION_TOKENS = 800
+# Body size assumed for papers when none of the sample is downloaded yet
+DEFAULT_BODY_TOKENS = 15000
+DEFAULT_ESCALATION_RATE = 0.3
+
+
+def body_tokens(arxiv_id, papers_dir=PAPERS_DIR):
+    """Token count of body.txt, cached in fetch.json. None if not downloaded."""
+    body_path = os.path.join(papers_dir, arxiv_id, "body.txt")
+    if not os.path.exists(body_path):
+        return None
+    info = load_fetch_info(arxiv_id, papers_dir) or {}
+    if info.get("token_encoding") == TOKEN_ENCODING and "body_tokens" in info:
+        return info["body_tokens"]
+    with open(body_path, "r", encoding="utf-8") as f:
+        body = f.read()
+    info.setdefault("content_hash", content_hash(body))
+    info["body_tokens"] = count_tokens(body)
+    info["token_encoding"] = TOKEN_ENCODING
+    save_paper_info(arxiv_id, info, papers_dir)
+    return info["body_tokens"]
+
+
+def template_tokens(layout="rubric_first"):
+    return {name: count_tokens(build_prompt(t, "", layout)) for name, t in TEMPLATES.items()}
+
+
+def load_throughput(result_dir, year=None):
+    """
+    {model: {"seconds_per_call", "completion_tokens_per_call", "calls"}}
+    measured in earlier runs (usage_{year}.json, else any usage_*.json).
+    """
+    paths = glob.glob(os.path.join(result_dir, f"usage_{year}.json")) if year is not None else []
+    paths = paths or sorted(glob.glob(os.path.join(result_dir, "usage_*.json")))
+    totals = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for model, u in json.load(f).items():
+                t = totals.setdefault(model, {"calls": 0, "seconds": 0.0, "completion_tokens": 0})
+                for k in t:
+                    t[k] += u.get(k, 0)
+    out = {}
+    for model, t in totals.items():
+        if t["calls"]:
+            out[model] = {
+                "calls": t["calls"],
+                "seconds_per_call": t["seconds"] / t["calls"],
+                "completion_tokens_per_call": t["completion_tokens"] / t["calls"],
+            }
+    return out
+
+
+def load_escalation_rates(result_dir, year):
+    """Per-metric escalation rate from an earlier cascade_stats_{year}.json, if any."""
+    path = os.path.join(result_dir, f"cascade_stats_{year}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {m: st["escalation_rate"] for m, st in json.load(f).get("metrics", {}).items()}
+
+
+class Planner:
+    def __init__(self, models, escalation_rates=None, throughput=None, prices=None,
+                 samples=1, supports_n=True, layout="rubric_first", papers_dir=PAPERS_DIR):
+        # models: [model] for a plain run, [cheap, strong] for a cascade
+        self.models = list(models)
+        self.escalation_rates = escalation_rates or {}
+        self.throughput = throughput or {}
+        self.prices = dict(MODEL_PRICES, **(prices or {}))
+        self.samples = samples
+        # Without `n`, every sample is a separate call that pays for the prompt again
+        self.input_copies = 1 if supports_n or samples <= 1 else samples
+        self.layout = layout
+        self.papers_dir = papers_dir
+
+    def _calls(self, metric):
+        """[(model, share of papers that call it)] for one metric."""
+        if len(self.models) == 1:
+            return [(self.models[0], 1.0)]
+        rate = self.escalation_rates.get(metric, DEFAULT_ESCALATION_RATE)
+        return [(self.models[0], 1.0), (self.models[1], rate)]
+
+    def _rate(self, model):
+        t = self.throughput.get(model, {})
+        return (t.get("seconds_per_call", DEFAULT_SECONDS_PER_CALL),
+                t.get("completion_tokens_per_call", DEFAULT_COMPLETION_TOKENS) or DEFAULT_COMPLETION_TOKENS)
+
+    def paper_tokens(self, arxiv_id, prepare=None):
+        """
+        Per-metric prompt text tokens of one paper (without the template).
+        With `prepare(body) -> (texts, info)` the text of each metric is
+        compressed/selected first; otherwise the cached body count is used.
+        None if the paper is not downloaded.
+        """
+        if prepare is None:
+            n = body_tokens(arxiv_id, self.papers_dir)
+            return None if n is None else {name: n for name in TEMPLATES}
+        body_path = os.path.join(self.papers_dir, arxiv_id, "body.txt")
+        if not os.path.exists(body_path):
+            return None
+        with open(body_path, "r", encoding="utf-8") as f:
+            texts, _ = prepare(f.read())
+        return {name: count_tokens(texts[name]) for name in TEMPLATES}
+
+    def plan(self, papers, workers=1, prepare=None):
+        """
+        Estimate a run over (domain, arxiv_id) pairs with `workers` papers
+        scored concurrently. Papers not downloaded yet are counted at the
+        mean size of the downloaded ones.
+        """
+        tmpl = template_tokens(self.layout)
+        known, missing = {}, []
+        for _, arxiv_id in papers:
+            tokens = self.paper_tokens(arxiv_id, prepare)
+            if tokens is None:
+                missing.append(arxiv_id)
+            else:
+                known[arxiv_id] = tokens
+        if known:
+            mean = {name: sum(t[name] for t in known.values()) / len(known) for name in TEMPLATES}
+        else:
+            mean = {name: DEFAULT_BODY_TOKENS for name in TEMPLATES}
+
+        per_model = {m: {"calls": 0.0, "input_tokens": 0.0, "output_tokens": 0.0, "seconds": 0.0}
+                     for m in self.models}
+        overflow = []
+        for _, arxiv_id in papers:
+            tokens = known.get(arxiv_id, mean)
+            for name in TEMPLATES:
+                prompt = tmpl[name] + tokens[name]
+                for model, share in self._calls(name):
+                    seconds, completion = self._rate(model)
+                    u = per_model[model]
+                    u["calls"] += share
+                    u["input_tokens"] += share * prompt * self.input_copies
+                    u["output_tokens"] += share * completion * self.samples
+                    u["seconds"] += share * seconds
+                    window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+                    if arxiv_id in known and prompt + completion * self.samples > window:
+                        overflow.append({"arxiv_id": arxiv_id, "metric": name, "model": model,
+                                         "prompt_tokens": prompt, "context_window": window})
+
+        cost, priced = 0.0, True
+        for model, u in per_model.items():
+            price = self.prices.get(model)
+            if price is None:
+                u["cost"] = None
+                priced = False
+            else:
+                u["cost"] = round((u["input_tokens"] * price["input"] + u["output_tokens"] * price["output"]) / 1e6, 4)
+                cost += u["cost"]
+            for k in ("calls", "input_tokens", "output_tokens"):
+                u[k] = round(u[k])
+        llm_seconds = sum(u["seconds"] for u in per_model.values())
+        for u in per_model.values():
+            u["seconds"] = round(u["seconds"], 1)
+        return {
+            "papers": len(papers),
+            "downloaded": len(known),
+            "not_downloaded": missing,
+            "template_tokens": tmpl,
+            "mean_text_tokens": {name: round(v) for name, v in mean.items()},
+            "samples": self.samples,
+            "models": per_model,
+            "input_tokens": sum(u["input_tokens"] for u in per_model.values()),
+            "output_tokens": sum(u["output_tokens"] for u in per_model.values()),
+            # None when a model has no known price
+            "cost_usd": round(cost, 2) if priced else None,
+            "llm_seconds": round(llm_seconds, 1),
+            # Metrics of one paper are scored one after another; papers in parallel
+            "wall_seconds": round(llm_seconds / max(1, min(workers, len(papers) or 1)), 1),
+            "measured_throughput": sorted(m for m in self.models if m in self.throughput),
+            "overflow": overflow,
+        }
@@ -0,0 +1,75 @@
+# Summarize evaluation results per domain and metric.
+# python -m pipeline.report --result_dir results
+
+import argparse
+import glob
+import json
+import os
+import statistics
+
+
+def load_results(result_dir):
+    results = []
+    for path in sorted(glob.glob(os.path.join(result_dir, "eval_results_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            results.append(json.load(f))
+    return results
+
+
+def paper_results(results, sampled_only=False):
+    """
+    One result per paper with the domains it counts for. A cross-listed
+    paper has one result file per sampled domain but is counted once in
+    each of its domains (only the sampled ones with sampled_only).
+    """
+    papers = {}
+    for r in results:
+        domains = r.get("sampled_domains" if sampled_only else "domains") or [r["domain"]]
+        if r["arxiv_id"] in papers:
+            seen = papers[r["arxiv_id"]][1]
+            seen.extend(d for d in domains + [r["domain"]] if d not in seen)
+        else:
+            papers[r["arxiv_id"]] = (r, list(domains))
+    return list(papers.values())
+
+
+def summarize(results, sampled_only=False):
+    """{domain: {metric: {"n", "mean", "std"}}} over all *_score fields."""
+    values = {}
+    for r, domains in paper_results(results, sampled_only):
+        for key, val in r.items():
+            if key.endswith("_score") and isinstance(val, (int, float)):
+                for domain in domains:
+                    values.setdefault(domain, {}).setdefault(key[:-len("_score")], []).append(val)
+    out = {}
+    for domain, metrics in sorted(values.items()):
+        out[domain] = {}
+        for metric, vals in sorted(metrics.items()):
+            out[domain][metric] = {
+                "n": len(vals),
+                "mean": round(statistics.fmean(vals), 4),
+                "std": round(statistics.stdev(vals), 4) if len(vals) > 1 else 0.0,
+            }
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Summarize evaluation results per domain and metric.")
+    ap.add_argument("--result_dir", type=str, default="results", help="Directory with eval_results_*.json")
+    ap.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    ap.add_argument("--sampled_only", action="store_true",
+                    help="Count cross-listed papers only in the domains they were sampled for")
+    args = ap.parse_args(argv)
+
+    summary = summarize(load_results(args.result_dir), args.sampled_only)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+    for domain, metrics in summary.items():
+        print(f"[{domain}]")
+        for metric, st in metrics.items():
+            print(f"  {metric:<28} n={st['n']:<5} mean={st['mean']:.2f}  std={st['std']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
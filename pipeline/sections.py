@@ -0,0 +1,129 @@
+# Section-targeted context selection: index body.txt by its "#" headings
+# (see dataset.fetch_paper._markdownize_headings) and build each metric's
+# prompt from the sections most relevant to it, within a token budget.
+
+import re
+
+from pipeline.compress import count_tokens
+
+HEADING_LINE_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+
+# Title keywords per metric, most relevant first. The front matter (text
+# before the first heading, the document title and the abstract) is always
+# kept.
+SECTION_KEYWORDS = {
+    "empirical_clarity": [
+        "ablation", "experiment", "result", "evaluation", "baseline", "setup",
+        "implementation", "hyperparameter", "benchmark", "comparison", "introduction",
+    ],
+    "explanation_vs_speculation": [
+        "discussion", "analysis", "interpretation", "limitation", "conclusion",
+        "why", "insight", "result", "introduction",
+    ],
+    "language_misuse": [
+        "abstract", "introduction", "conclusion", "discussion", "contribution",
+        "overview", "motivation", "limitation",
+    ],
+    "math_quality": [
+        "theor", "proof", "derivation", "lemma", "preliminar", "formulation",
+        "method", "model", "analysis", "framework", "notation", "appendix",
+    ],
+}
+
+DEFAULT_SECTION_BUDGET = 12000
+
+
+def build_section_index(text):
+    """
+    Split a paper body into sections. Returns a list of dicts with
+    title, level, parent (index or None), text and tokens, in document order.
+    """
+    sections = []
+    heads = list(HEADING_LINE_RE.finditer(text))
+    first = heads[0].start() if heads else len(text)
+    if text[:first].strip():
+        sections.append({"title": "Preamble", "level": 0, "parent": None, "text": text[:first]})
+    stack = []  # indices of open ancestors
+    for i, m in enumerate(heads):
+        end = heads[i + 1].start() if i + 1 < len(heads) else len(text)
+        level = len(m.group(1))
+        while stack and sections[stack[-1]]["level"] >= level:
+            stack.pop()
+        sections.append({
+            "title": m.group(2),
+            "level": level,
+            "parent": stack[-1] if stack else None,
+            "text": text[m.start():end],
+        })
+        stack.append(len(sections) - 1)
+    for sec in sections:
+        sec["tokens"] = count_tokens(sec["text"])
+    return sections
+
+
+def front_matter(sections):
+    """
+    Indices of the preamble, the document title (the only level-1 heading,
+    as on ar5iv) and an abstract heading directly under either.
+    """
+    front = {i for i, s in enumerate(sections) if s["level"] == 0}
+    roots = [i for i, s in enumerate(sections) if s["level"] == 1]
+    if len(roots) == 1:
+        front.add(roots[0])
+    for i, sec in enumerate(sections):
+        if sec["title"].lower().startswith("abstract") and (sec["parent"] is None or sec["parent"] in front):
+            front.add(i)
+    return front
+
+
+def _relevance(title, keywords):
+    t = title.lower()
+    for rank, kw in enumerate(keywords):
+        if kw in t:
+            return len(keywords) - rank
+    return 0
+
+
+class SectionSelector:
+    def __init__(self, budget=DEFAULT_SECTION_BUDGET, keywords=None):
+        self.budget = budget
+        self.keywords = keywords or SECTION_KEYWORDS
+
+    def select(self, metric, text, sections=None):
+        """
+        Return (selected_text, titles) for `metric`. Papers that already fit
+        the budget are returned unchanged.
+        """
+        sections = sections if sections is not None else build_section_index(text)
+        if sum(s["tokens"] for s in sections) <= self.budget:
+            return text, [s["title"] for s in sections]
+
+        keywords = self.keywords.get(metric, [])
+        front = front_matter(sections)
+        scores = []
+        for i, sec in enumerate(sections):
+            score = _relevance(sec["title"], keywords)
+            # Subsections inherit the relevance of their parent ("Experiments" > "Setup"),
+            # but not of the document title, which is every section's ancestor
+            parent = sec["parent"]
+            if parent is not None and sections[parent]["level"] >= 2:
+                score = max(score, scores[parent])
+            scores.append(score)
+
+        order = sorted(range(len(sections)), key=lambda i: (i not in front, -scores[i], i))
+        chosen, used = {}, 0
+        for i in order:
+            sec = sections[i]
+            left = self.budget - used
+            if left <= 0:
+                break
+            if sec["tokens"] <= left:
+                chosen[i] = sec["text"]
+                used += sec["tokens"]
+            elif scores[i] > 0 or i in front:
+                # Relevant but too long: keep its head, proportional to what is left
+                cut = int(len(sec["text"]) * left / sec["tokens"])
+                chosen[i] = sec["text"][:cut]
+                used = self.budget
+        idx = sorted(chosen)
+        return "\n\n".join(chosen[i].strip() for i in idx), [sections[i]["title"] for i in idx]
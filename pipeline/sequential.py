@@ -0,0 +1,140 @@
+# Adaptive sequential sampling: score the seeded per-domain samples in
+# batches and stop a domain once the 95% confidence interval of every
+# metric's mean is narrower than a target width (or its sample runs out).
+# The batches are prefixes of the usual random.sample lists, so an adaptive
+# run scores a subset of what the fixed-size run with the same seed would.
+
+import math
+import statistics
+
+# Two-sided 95% Student t critical values by degrees of freedom
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+DEFAULT_BATCH_SIZE = 5
+DEFAULT_TARGET_CI = 1.0
+# Never stop a domain on fewer papers than this
+DEFAULT_MIN_PAPERS = 10
+
+
+def t_critical(df):
+    if df < 1:
+        return math.inf
+    # Largest tabulated df not above df (conservative)
+    return _T95[max(k for k in _T95 if k <= df)] if df <= 120 else 1.96
+
+
+def mean_ci(values):
+    """{"n", "mean", "ci95", "width"} of a list of scores (t interval; width None below 2 scores)."""
+    n = len(values)
+    if n == 0:
+        return {"n": 0, "mean": None, "ci95": None, "width": None}
+    mean = statistics.fmean(values)
+    if n < 2:
+        return {"n": n, "mean": round(mean, 4), "ci95": None, "width": None}
+    half = t_critical(n - 1) * statistics.stdev(values) / math.sqrt(n)
+    return {"n": n, "mean": round(mean, 4), "ci95": [round(mean - half, 4), round(mean + half, 4)],
+            "width": round(2 * half, 4)}
+
+
+def diff_ci(a, b):
+    """Welch 95% interval of mean(a) - mean(b); "separated" when it excludes 0."""
+    if len(a) < 2 or len(b) < 2:
+        return {"diff": None, "ci95": None, "separated": False}
+    va, vb = statistics.variance(a) / len(a), statistics.variance(b) / len(b)
+    diff = statistics.fmean(a) - statistics.fmean(b)
+    se = math.sqrt(va + vb)
+    if se == 0:
+        return {"diff": round(diff, 4), "ci95": [round(diff, 4)] * 2, "separated": diff != 0}
+    df = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+    half = t_critical(int(df)) * se
+    return {"diff": round(diff, 4), "ci95": [round(diff - half, 4), round(diff + half, 4)],
+            "separated": diff - half > 0 or diff + half < 0}
+
+
+class SequentialSampler:
+    def __init__(self, samples, metrics, batch_size=DEFAULT_BATCH_SIZE, target_width=DEFAULT_TARGET_CI,
+                 min_papers=DEFAULT_MIN_PAPERS, stop_when_separated=False):
+        # samples: {domain: [arxiv_id, ...]} in seeded random order (the cap per domain)
+        self.samples = {d: list(ids) for d, ids in samples.items()}
+        self.metrics = list(metrics)
+        self.batch_size = batch_size
+        self.target_width = target_width
+        self.min_papers = min_papers
+        # Also stop once every metric tells the (first two) domains apart
+        self.stop_when_separated = stop_when_separated
+        self.taken = {d: 0 for d in self.samples}
+        self.scores = {d: {m: [] for m in self.metrics} for d in self.samples}
+        self.rounds = []
+
+    def next_batch(self):
+        """The next batch_size (domain, arxiv_id) pairs of every unfinished domain."""
+        batch = []
+        for d, ids in self.samples.items():
+            if self.domain_done(d):
+                continue
+            start = self.taken[d]
+            batch.extend((d, aid) for aid in ids[start:start + self.batch_size])
+            self.taken[d] = min(len(ids), start + self.batch_size)
+        return batch
+
+    def add(self, result, domains):
+        """Count a scored paper (eval_results dict) for the given domains."""
+        for d in domains:
+            for m in self.metrics:
+                val = result.get(f"{m}_score")
+                if isinstance(val, (int, float)):
+                    self.scores[d][m].append(val)
+
+    def intervals(self):
+        return {d: {m: mean_ci(vals) for m, vals in metrics.items()} for d, metrics in self.scores.items()}
+
+    def differences(self):
+        """Per-metric difference between the first two domains."""
+        domains = list(self.samples)[:2]
+        if len(domains) < 2:
+            return {}
+        a, b = (self.scores[d] for d in domains)
+        return {m: dict(diff_ci(a[m], b[m]), domains=domains) for m in self.metrics}
+
+    def separated(self):
+        diffs = self.differences()
+        return bool(diffs) and all(
+            d["separated"] and min(len(self.scores[x][m]) for x in d["domains"]) >= self.min_papers
+            for m, d in diffs.items())
+
+    def converged(self, domain):
+        cis = [mean_ci(v) for v in self.scores[domain].values()]
+        return all(ci["n"] >= self.min_papers and ci["width"] is not None and ci["width"] <= self.target_width
+                   for ci in cis)
+
+    def domain_done(self, domain):
+        if self.stop_when_separated and self.separated():
+            return True
+        return self.converged(domain) or self.taken[domain] >= len(self.samples[domain])
+
+    def finished(self):
+        return all(self.domain_done(d) for d in self.samples)
+
+    def consumed(self):
+        """(domain, arxiv_id) pairs handed out so far."""
+        return [(d, aid) for d, ids in self.samples.items() for aid in ids[:self.taken[d]]]
+
+    def record_round(self, **extra):
+        self.rounds.append(dict(extra, taken=dict(self.taken), intervals=self.intervals(),
+                                differences=self.differences(),
+                                converged=[d for d in self.samples if self.converged(d)]))
+
+    def summary(self):
+        return {
+            "batch_size": self.batch_size,
+            "target_ci_width": self.target_width,
+            "min_papers": self.min_papers,
+            "cap": {d: len(ids) for d, ids in self.samples.items()},
+            "taken": dict(self.taken),
+            "converged": [d for d in self.samples if self.converged(d)],
+            "intervals": self.intervals(),
+            "differences": self.differences(),
+            "separated": self.separated(),
+            "rounds": self.rounds,
+        }
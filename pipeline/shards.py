@@ -0,0 +1,170 @@
+# Deterministic sharding of one study across machines, and merging of the
+# shard outputs. Every shard samples the same paper set (same year, seed and
+# num_sample) and keeps the papers whose stable arxiv_id hash falls in it.
+#
+# Merge shard result directories with:
+# python -m pipeline.shards merge results_0 results_1 results_2 --out results
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+
+def parse_shard(spec):
+    """"i/N" -> (i, N), with 0 <= i < N."""
+    try:
+        i, n = (int(x) for x in spec.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {spec!r}")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard index out of range: {spec!r}")
+    return i, n
+
+
+def shard_of(arxiv_id, n):
+    # Python's hash() is salted per process; use a fixed digest instead
+    h = hashlib.sha1(arxiv_id.encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "big") % n
+
+
+def select_shard(papers, shard):
+    """Keep the (domain, arxiv_id) pairs that belong to shard (i, N)."""
+    i, n = shard
+    return [p for p in papers if shard_of(p[1], n) == i]
+
+
+def sample_digest(papers):
+    s = "\n".join(f"{d}\t{a}" for d, a in sorted(papers))
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def manifest_path(result_dir, year, shard):
+    return os.path.join(result_dir, f"manifest_{year}_shard{shard[0]}of{shard[1]}.json")
+
+
+def write_manifest(result_dir, year, shard, sampled, assigned, scored, failed, extra=None):
+    manifest = {
+        "year": year,
+        "shard": list(shard),
+        "sample_size": len(sampled),
+        "sample_digest": sample_digest(sampled),
+        "assigned": sorted(list(p) for p in assigned),
+        "scored": sorted(list(p) for p in scored),
+        "failed": sorted(list(p) for p in failed),
+    }
+    if extra:
+        manifest.update(extra)
+    os.makedirs(result_dir, exist_ok=True)
+    path = manifest_path(result_dir, year, shard)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def merge(result_dirs, out_dir):
+    """
+    Merge shard outputs into out_dir. Returns (merged_manifest, problems);
+    problems is a list of human-readable strings, empty when the merge is
+    complete and consistent.
+    """
+    problems = []
+    manifests = []
+    for d in result_dirs:
+        for path in sorted(glob.glob(os.path.join(d, "manifest_*_shard*of*.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                manifests.append((path, json.load(f)))
+    if not manifests:
+        return None, [f"no shard manifests found in {', '.join(result_dirs)}"]
+
+    first = manifests[0][1]
+    n = first["shard"][1]
+    seen_shards = {}
+    for path, m in manifests:
+        for key in ("year", "sample_size", "sample_digest"):
+            if m[key] != first[key]:
+                problems.append(f"{path}: {key} {m[key]!r} differs from {first[key]!r}")
+        if m["shard"][1] != n:
+            problems.append(f"{path}: shard count {m['shard'][1]} differs from {n}")
+        seen_shards.setdefault(m["shard"][0], []).append(path)
+    for i in range(n):
+        if i not in seen_shards:
+            problems.append(f"shard {i}/{n} is missing")
+        elif len(seen_shards[i]) > 1:
+            problems.append(f"shard {i}/{n} appears more than once: {seen_shards[i]}")
+
+    assigned, scored, failed = {}, set(), set()
+    for path, m in manifests:
+        for p in m["assigned"]:
+            p = tuple(p)
+            if p in assigned:
+                problems.append(f"{p[1]} ({p[0]}) assigned to both {assigned[p]} and {path}")
+            assigned[p] = path
+        scored.update(tuple(p) for p in m["scored"])
+        failed.update(tuple(p) for p in m["failed"])
+    if len(assigned) != first["sample_size"]:
+        problems.append(f"shards cover {len(assigned)} papers, sample has {first['sample_size']}")
+
+    # Copy this study's result files, refusing duplicates across shards
+    wanted = {f"eval_results_{d}_{a}.json" for d, a in assigned}
+    os.makedirs(out_dir, exist_ok=True)
+    copied = {}
+    for d in result_dirs:
+        for path in sorted(glob.glob(os.path.join(d, "eval_results_*.json"))):
+            name = os.path.basename(path)
+            if name not in wanted:
+                continue
+            if name in copied:
+                if os.path.abspath(copied[name]) != os.path.abspath(path):
+                    problems.append(f"duplicate result {name} in {copied[name]} and {path}")
+                continue
+            copied[name] = path
+            dst = os.path.join(out_dir, name)
+            if os.path.abspath(dst) != os.path.abspath(path):
+                shutil.copyfile(path, dst)
+    for domain, aid in scored:
+        if f"eval_results_{domain}_{aid}.json" not in copied:
+            problems.append(f"{aid} ({domain}) marked scored but its result file is missing")
+
+    missing = sorted(set(assigned) - scored)
+    if missing:
+        shown = ", ".join(aid for _, aid in missing[:10])
+        problems.append(f"{len(missing)} assigned papers have no result: {shown}{' ...' if len(missing) > 10 else ''}")
+    merged = {
+        "year": first["year"],
+        "shard": [0, 1],
+        "merged_from": [path for path, _ in manifests],
+        "sample_size": first["sample_size"],
+        "sample_digest": first["sample_digest"],
+        "assigned": sorted(list(p) for p in assigned),
+        "scored": sorted(list(p) for p in scored),
+        "failed": sorted(list(p) for p in failed),
+        "missing": [list(p) for p in missing],
+    }
+    with open(os.path.join(out_dir, f"manifest_{first['year']}_merged.json"), "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+    return merged, problems
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Merge sharded evaluation results.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    mp = sub.add_parser("merge", help="Combine shard result directories")
+    mp.add_argument("dirs", nargs="+", help="Shard result directories")
+    mp.add_argument("--out", type=str, default="results", help="Merged output directory")
+    args = ap.parse_args(argv)
+
+    merged, problems = merge(args.dirs, args.out)
+    if merged is not None:
+        print(f"[MERGE] {len(merged['scored'])}/{merged['sample_size']} 篇已评估, "
+              f"失败 {len(merged['failed'])}, 缺失 {len(merged['missing'])}")
+    for p in problems:
+        print(f"[ERROR] {p}")
+    if problems:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Staged streaming pipeline: each stage has its own worker threads and a
+# bounded input queue, so a slow stage applies backpressure to the ones
+# before it and all stages run concurrently (download paper 50 while
+# scoring paper 1).
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1):
+        # fn(item) -> new item, or None to drop the item
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy = 0.0
+
+
+class StagedPipeline:
+    def __init__(self, stages, queue_size=8, on_error=None):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        # on_error(stage_name, item, exc); items that raise are dropped
+        self.on_error = on_error
+        # Summed over run() calls; stage counters accumulate the same way
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def _worker(self, stage, q_in, q_out):
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                # Let the sibling workers see the sentinel too
+                q_in.put(_DONE)
+                return
+            t0 = time.monotonic()
+            try:
+                out = stage.fn(item)
+            except Exception as e:
+                out = None
+                with self._lock:
+                    stage.failed += 1
+                if self.on_error is not None:
+                    self.on_error(stage.name, item, e)
+            with self._lock:
+                stage.busy += time.monotonic() - t0
+                stage.processed += 1
+                if out is None:
+                    stage.dropped += 1
+            if out is not None:
+                # Blocks while the next stage is behind (backpressure)
+                q_out.put(out)
+
+    def run(self, items):
+        """Feed `items` through all stages; return the outputs of the last stage."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = queue.Queue()
+        outs = queues[1:] + [results]
+        threads = []
+        for stage, q_in, q_out in zip(self.stages, queues, outs):
+            ts = [threading.Thread(target=self._worker, args=(stage, q_in, q_out),
+                                   name=f"{stage.name}-{i}", daemon=True)
+                  for i in range(stage.workers)]
+            for t in ts:
+                t.start()
+            threads.append(ts)
+
+        t0 = time.monotonic()
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+        # Close each stage once all of its workers have drained, in order
+        for i, ts in enumerate(threads):
+            for t in ts:
+                t.join()
+            if i + 1 < len(queues):
+                queues[i + 1].put(_DONE)
+        self.wall_time += time.monotonic() - t0
+
+        out = []
+        while not results.empty():
+            out.append(results.get())
+        return out
+
+    def summary(self):
+        out = {"wall_time": round(self.wall_time, 2), "stages": {}}
+        for st in self.stages:
+            out["stages"][st.name] = {
+                "workers": st.workers,
+                "processed": st.processed,
+                "dropped": st.dropped,
+                "failed": st.failed,
+                "busy_seconds": round(st.busy, 2),
+            }
+        return out
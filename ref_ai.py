@@ -1,11 +1,14 @@
 import os
 import json
 import re
-import requests
-import Levenshtein
-from habanero import Crossref
 from typing import Dict, List, Optional
+import argparse
+import hashlib
 import time
+import glob
+
+from api import ratelimit
+from dataset.fetch_index import fetch_metadata_by_ids
 
 # ====================== 配置常量 ======================
 # 根路径（注意用原始字符串避免转义）
@@ -19,8 +22,17 @@ HEADERS = {
 }
 # 模糊匹配阈值（标题相似度≥0.8视为匹配）
 TITLE_SIMILARITY_THRESHOLD = 0.8
+# 期刊相似度低于该值判定L1
+JOURNAL_SIMILARITY_THRESHOLD = 0.5
 # 年份容忍区间
 YEAR_TOLERANCE = 1
+# 本地 arXiv 索引目录（indices_{year}.json）与 arXiv 元数据查询缓存
+INDICES_DIR = os.path.join(os.path.dirname(PAPERS_ROOT), "indices")
+ARXIV_META_CACHE_PATH = os.path.join(os.path.dirname(PAPERS_ROOT), "arxiv_meta_cache.json")
+# arXiv API 每次 id_list 查询的ID数
+ARXIV_BATCH_SIZE = 200
+# 逐条引用判定日志（只追加），中断后据此续跑，也可离线按新阈值重新汇总
+CITATION_LOG_PATH = os.path.join(os.path.dirname(PAPERS_ROOT), "citation_log.jsonl")
 # Crossref实例（用于学术数据库查询）
 #cr = Crossref(headers=HEADERS)
 #cr = Crossref(request_options={"headers": HEADERS})
@@ -40,6 +52,21 @@ def get_all_ref_json_paths() -> List[Dict[str, str]]:
             })
     return ref_files
 
+def get_papers_without_refs() -> List[str]:
+    """已下载但没有参考文献的论文（如正文来自 PDF，fetch.json 中 refs_available 为 false）"""
+    out = []
+    for folder_name in os.listdir(PAPERS_ROOT):
+        fetch_path = os.path.join(PAPERS_ROOT, folder_name, "fetch.json")
+        if os.path.exists(os.path.join(PAPERS_ROOT, folder_name, "ref.json")) or not os.path.exists(fetch_path):
+            continue
+        try:
+            with open(fetch_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("refs_available") is False:
+                    out.append(folder_name)
+        except (OSError, ValueError):
+            continue
+    return out
+
 def parse_citation_text(citation_text: str) -> Dict:
     """
     解析引文文本，提取结构化数据（作者、标题、年份、DOI）
@@ -99,6 +126,14 @@ def parse_citation_text(citation_text: str) -> Dict:
 
     return parsed
 
+class CitationLookupError(Exception):
+    """DOI/Crossref 查询本身失败（网络等），不能据此判定引用是否存在"""
+
+def _raise_if_retryable(response, what: str):
+    """429 与 5xx 是临时失败（续跑时重试）；其余 4xx 是明确答复，由调用方按“未找到”处理"""
+    if response.status_code == 429 or response.status_code >= 500:
+        raise CitationLookupError(f"{what}: HTTP {response.status_code}")
+
 def validate_doi(doi: str) -> Optional[Dict]:
     """验证DOI是否存在，返回权威元数据（None表示不存在）"""
     if not doi:
@@ -108,18 +143,24 @@ def validate_doi(doi: str) -> Optional[Dict]:
     # 调用doi.org API
     url = f"https://doi.org/api/handles/{doi}"
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = ratelimit.limited_get(url, headers=HEADERS, timeout=10)
+        _raise_if_retryable(response, f"DOI {doi}")
         if response.status_code == 404:
             return None  # DOI不存在
         elif response.status_code == 200:
             cr_url = f"https://api.crossref.org/works/{doi}"
-            cr_response = requests.get(cr_url, headers=HEADERS, timeout=10)
+            cr_response = ratelimit.limited_get(cr_url, headers=HEADERS, timeout=10)
+            _raise_if_retryable(cr_response, f"Crossref DOI {doi}")
             if cr_response.status_code == 200:
                 return cr_response.json().get("message", {})
         return None
+    except CitationLookupError as e:
+        print(f"DOI验证失败 {doi}: {str(e)}")
+        raise
     except Exception as e:
+        # 网络错误不等于DOI不存在：不下结论，留待续跑时重试
         print(f"DOI验证失败 {doi}: {str(e)}")
-        return None
+        raise CitationLookupError(f"DOI {doi}: {e}") from e
 
 def search_by_title_author(title: str, authors: List[str]) -> Optional[Dict]:
     """通过标题+作者搜索CrossRef，返回最匹配的元数据"""
@@ -138,15 +179,20 @@ def search_by_title_author(title: str, authors: List[str]) -> Optional[Dict]:
 
     try:
         # 直接使用 requests 调用 API
-        response = requests.get(url, params=params, headers=HEADERS, timeout=10)
-        if response.status_code == 200:
-            items = response.json().get("message", {}).get("items", [])
+        response = ratelimit.limited_get(url, params=params, headers=HEADERS, timeout=10)
+        _raise_if_retryable(response, f"Crossref search {title[:50]}")
+        if response.status_code != 200:
+            return None  # 明确的 4xx（如查询无效）：视为未找到
+        items = response.json().get("message", {}).get("items", [])
         if items:
             return items[0]  # 返回最相关的结果
         return None
+    except CitationLookupError as e:
+        print(f"标题+作者搜索失败 {title[:50]}: {str(e)}")
+        raise
     except Exception as e:
         print(f"标题+作者搜索失败 {title[:50]}: {str(e)}")
-        return None
+        raise CitationLookupError(f"Crossref search {title[:50]}: {e}") from e
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
     """计算文本相似度（Levenshtein距离）"""
@@ -158,131 +204,353 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     if not clean1 or not clean2:
         return 0.0
     # 计算相似度（0-1）
+    import Levenshtein  # 按需加载
     distance = Levenshtein.distance(clean1, clean2)
     max_len = max(len(clean1), len(clean2))
     return 1 - (distance / max_len) if max_len > 0 else 0.0
 
-def compare_metadata(parsed: Dict, official_meta: Dict) -> int:
-    """
-    比对解析数据和权威元数据，返回级别：
-    0 = L0（格式错误）, 1 = L1（部分失实）, 2 = L2（完全捏造）
-    """
-    # 1. 标题相似度检查
-    official_title = official_meta.get("title", [""])[0]
-    title_similarity = calculate_text_similarity(parsed["title"], official_title)
-    if title_similarity < TITLE_SIMILARITY_THRESHOLD:
-        return 2  # 标题不匹配，判定L2
+def metadata_evidence(parsed: Dict, official_meta: Dict) -> Dict:
+    """比对解析数据和权威元数据，返回判定所需的全部证据（写入日志，离线可重新判定）"""
+    # 1. 标题相似度
+    official_title = (official_meta.get("title") or [""])[0]
+    evidence = {
+        "matched_doi": official_meta.get("DOI"),
+        "matched_title": official_title,
+        "title_similarity": round(calculate_text_similarity(parsed["title"], official_title), 4),
+    }
 
-    # 2. 作者比对（L1核心检查）
+    # 2. 作者交集（任一方无作者信息时为 None）
     parsed_authors = [a.split()[-1].lower() for a in parsed["authors"] if a.strip()]
     official_authors = []
     for auth in official_meta.get("author", []):
         if "family" in auth:
             official_authors.append(auth["family"].lower())
-    # 检查作者交集（至少匹配1个核心作者）
-    author_intersection = set(parsed_authors) & set(official_authors)
-    if not author_intersection and len(parsed_authors) > 0 and len(official_authors) > 0:
-        return 1  # 作者完全不匹配，判定L1
+    evidence["author_match"] = (bool(set(parsed_authors) & set(official_authors))
+                                if parsed_authors and official_authors else None)
 
-    # 3. 期刊比对（L1补充检查）
+    # 3. 期刊相似度（未解析出期刊时为 None）
+    evidence["journal_similarity"] = None
     if parsed["journal"]:
-        journal_similarity = calculate_text_similarity(parsed["journal"], official_meta.get("container-title", [""])[0])
-        if journal_similarity < 0.5:  # 期刊相似度极低
-            return 1
+        official_journal = (official_meta.get("container-title") or [""])[0]
+        evidence["journal_similarity"] = round(calculate_text_similarity(parsed["journal"], official_journal), 4)
 
-    # 4. 年份比对（L0次要检查）
+    # 4. 年份差
     official_year = None
     if "published-print" in official_meta and official_meta["published-print"].get("date-parts"):
         official_year = official_meta["published-print"]["date-parts"][0][0]
     elif "published-online" in official_meta and official_meta["published-online"].get("date-parts"):
         official_year = official_meta["published-online"]["date-parts"][0][0]
-    
-    if parsed["year"] and official_year:
-        year_diff = abs(parsed["year"] - official_year)
-        if year_diff > YEAR_TOLERANCE:
-            return 0  # 年份误差超范围，判定L0
+    evidence["year_diff"] = abs(parsed["year"] - official_year) if parsed["year"] and official_year else None
+    return evidence
 
-    # 5. 其他小错误（拼写、页码等）默认L0
+def classify_evidence(evidence: Dict, title_threshold: float = TITLE_SIMILARITY_THRESHOLD,
+                      journal_threshold: float = JOURNAL_SIMILARITY_THRESHOLD) -> int:
+    """
+    由证据判定级别：0 = L0（格式错误）, 1 = L1（部分失实）, 2 = L2（完全捏造）
+    """
+    if evidence["title_similarity"] < title_threshold:
+        return 2  # 标题不匹配，判定L2
+    if evidence["author_match"] is False:
+        return 1  # 作者完全不匹配，判定L1
+    if evidence["journal_similarity"] is not None and evidence["journal_similarity"] < journal_threshold:
+        return 1  # 期刊相似度极低
+    # 年份误差超范围（year_diff > YEAR_TOLERANCE）及其他小错误（拼写、页码等）均为L0
     return 0
 
-def process_paper_citations(arxiv_id: str, ref_path: str) -> float:
-    """处理单篇论文的所有引用，返回引用AI率"""
+def compare_metadata(parsed: Dict, official_meta: Dict) -> int:
+    """
+    比对解析数据和权威元数据，返回级别：
+    0 = L0（格式错误）, 1 = L1（部分失实）, 2 = L2（完全捏造）
+    """
+    return classify_evidence(metadata_evidence(parsed, official_meta))
+
+# arxiv_id -> 元数据（None 表示 arXiv 上不存在）
+_arxiv_meta = None
+
+def load_arxiv_meta() -> Dict:
+    """加载已知的 arXiv 元数据：本地索引中带标题的记录 + 历次 API 查询缓存"""
+    global _arxiv_meta
+    if _arxiv_meta is None:
+        _arxiv_meta = {}
+        for path in sorted(glob.glob(os.path.join(INDICES_DIR, "indices_*.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            meta = index.get("meta") if isinstance(index, dict) else None
+            if isinstance(meta, dict):
+                _arxiv_meta.update({k: v for k, v in meta.items() if v and v.get("title")})
+        if os.path.exists(ARXIV_META_CACHE_PATH):
+            with open(ARXIV_META_CACHE_PATH, "r", encoding="utf-8") as f:
+                _arxiv_meta.update(json.load(f))
+    return _arxiv_meta
+
+def _save_arxiv_cache(new_entries: Dict):
+    cache = {}
+    if os.path.exists(ARXIV_META_CACHE_PATH):
+        with open(ARXIV_META_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    cache.update(new_entries)
+    with open(ARXIV_META_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+def verify_arxiv_ids(arxiv_ids: List[str]) -> Dict:
+    """批量验证 arXiv ID：先查本地数据，剩余的通过 arXiv API id_list 批量查询"""
+    meta = load_arxiv_meta()
+    missing = sorted({a for a in arxiv_ids if a and a not in meta})
+    if missing:
+        try:
+            found = fetch_metadata_by_ids(missing, ARXIV_BATCH_SIZE)
+        except Exception as e:
+            # 查询失败时不缓存，这些引用回退到 Crossref 流程
+            print(f"arXiv 批量查询失败 ({len(missing)} 个ID): {str(e)}")
+            found = None
+        if found is not None:
+            new_entries = {a: found.get(a) for a in missing}
+            meta.update(new_entries)
+            _save_arxiv_cache(new_entries)
+    return {a: meta.get(a) for a in arxiv_ids if a}
+
+def arxiv_meta_to_crossref(entry: Dict, parsed: Dict) -> Dict:
+    """把 arXiv 元数据转换为 compare_metadata 使用的 Crossref 字段格式"""
+    meta = {
+        "title": [entry.get("title", "")],
+        "author": [{"family": n.split()[-1]} for n in entry.get("authors", []) if n.split()],
+        # arXiv 无法确认发表期刊/会议，期刊检查视为通过
+        "container-title": [parsed["journal"]],
+    }
+    published = entry.get("published") or ""
+    if published[:4].isdigit():
+        meta["published-online"] = {"date-parts": [[int(published[:4])]]}
+    return meta
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def record_level(record: Dict, title_threshold: float = TITLE_SIMILARITY_THRESHOLD,
+                 journal_threshold: float = JOURNAL_SIMILARITY_THRESHOLD) -> int:
+    """由日志记录重新判定级别（空引用/无匹配固定为L2）"""
+    if record["source"] in ("empty", "none"):
+        return 2
+    return classify_evidence(record, title_threshold, journal_threshold)
+
+class CitationLog:
+    """
+    逐条引用判定的追加日志（JSON Lines）。每条引用一行：论文、序号、引文哈希、
+    匹配来源与证据；每篇论文处理完后再写一行完成标记（各引用的引文哈希）。
+    只在内存中保留 (论文, 序号, 引文哈希) -> 级别，读取时忽略中断留下的残行。
+    """
+
+    def __init__(self, path: str = CITATION_LOG_PATH, title_threshold: float = TITLE_SIMILARITY_THRESHOLD,
+                 journal_threshold: float = JOURNAL_SIMILARITY_THRESHOLD):
+        self.path = path
+        self.title_threshold = title_threshold
+        self.journal_threshold = journal_threshold
+        self.levels = {}
+        self.done = {}
+        self._f = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._load(record)
+
+    def _load(self, record: Dict):
+        if "done" in record:
+            self.done[record["arxiv_id"]] = record["done"]
+        else:
+            key = (record["arxiv_id"], record["idx"], record["text_hash"])
+            self.levels[key] = record_level(record, self.title_threshold, self.journal_threshold)
+
+    def append(self, record: Dict):
+        if self._f is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._f = open(self.path, "a", encoding="utf-8")
+            if torn:
+                self._f.write("\n")  # 中断留下的残行单独成行，不吞掉下一条记录
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self._load(record)
+
+    def level(self, arxiv_id: str, idx: int, text_hash: str) -> Optional[int]:
+        return self.levels.get((arxiv_id, idx, text_hash))
+
+    def is_done(self, arxiv_id: str, text_hashes: List[str]) -> bool:
+        return self.done.get(arxiv_id) == text_hashes
+
+    def paper_rate(self, arxiv_id: str) -> Optional[float]:
+        """由日志重新计算引用AI率（L0=0, L1=1, L2=2 的平均）；未完成的论文返回 None"""
+        hashes = self.done.get(arxiv_id)
+        if hashes is None:
+            return None
+        levels = [self.level(arxiv_id, i, h) for i, h in enumerate(hashes)]
+        if None in levels:
+            return None
+        return sum(levels) / len(levels) if levels else 0.0
+
+    def rates(self) -> Dict:
+        return {aid: self.paper_rate(aid) for aid in self.done}
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+def verify_citation(cite_text: str, cite_arxiv_id: Optional[str], arxiv_meta: Dict) -> Dict:
+    """
+    验证单条引用，返回日志记录的判定部分：source（arxiv/doi/crossref/none）、
+    证据与级别。查询失败时抛出 CitationLookupError。
+    """
+    # 步骤1：解析引文
+    parsed = parse_citation_text(cite_text)
+    # 步骤2：验证存在性（L2）
+    official_meta, source = None, "none"
+    # 2.0 带 arXiv ID 的引用直接用 arXiv 元数据比对
+    arxiv_entry = arxiv_meta.get(cite_arxiv_id)
+    if arxiv_entry:
+        official_meta, source = arxiv_meta_to_crossref(arxiv_entry, parsed), "arxiv"
+    # 2.1 优先验证DOI
+    if not official_meta and parsed["doi"]:
+        official_meta, source = validate_doi(parsed["doi"]), "doi"
+    # 2.2 其次验证标题+作者
+    if not official_meta:
+        official_meta, source = search_by_title_author(parsed["title"], parsed["authors"]), "crossref"
+    if not official_meta:
+        # 无匹配结果，判定L2
+        return {"source": "none", "level": 2}
+    # 步骤3：元数据比对（L1/L0）
+    evidence = metadata_evidence(parsed, official_meta)
+    return dict(evidence, source=source, level=classify_evidence(evidence))
+
+def process_paper_citations(arxiv_id: str, ref_path: str, log: Optional[CitationLog] = None) -> Optional[float]:
+    """
+    处理单篇论文的所有引用，逐条写入日志并返回引用AI率。
+    已在日志中的引用（引文未变）不再查询；有引用查询失败或处理出错时返回 None，
+    下次运行从日志续跑。
+    """
+    log = log if log is not None else CitationLog()
     try:
         # 读取ref.json
         with open(ref_path, "r", encoding="utf-8") as f:
             citations = json.load(f)
+        hashes = [_text_hash(c.get("text", "").strip()) for c in citations]
+        if log.is_done(arxiv_id, hashes):
+            ai_rate = log.paper_rate(arxiv_id)
+            if ai_rate is not None:
+                print(f"[RESUME] {arxiv_id} 已完成，使用日志结果")
+                return ai_rate
+            # 有完成标记但缺少部分判定（残行丢失）：只重新查询缺失的引用
+            print(f"[RESUME] {arxiv_id} 日志缺少部分引用判定，重新查询")
         if not citations:
             print(f"[SKIP] {arxiv_id} 无引用数据")
-            return 0.0
 
-        citation_levels = []
+        # arXiv 引用走批量快速通道
+        arxiv_meta = verify_arxiv_ids([c.get("arxiv_id") for c in citations if c.get("arxiv_id")])
+
+        incomplete = 0
         for idx, cite in enumerate(citations):
+            if log.level(arxiv_id, idx, hashes[idx]) is not None:
+                continue  # 续跑：该引用已判定
             cite_text = cite.get("text", "").strip()
             if not cite_text:
-                citation_levels.append(2)  # 空引用判定L2
-                continue
-            
-            # 步骤1：解析引文
-            parsed = parse_citation_text(cite_text)
-            # 步骤2：验证存在性（L2）
-            official_meta = None
-            # 2.1 优先验证DOI
-            if parsed["doi"]:
-                official_meta = validate_doi(parsed["doi"])
-            # 2.2 其次验证标题+作者
-            if not official_meta:
-                official_meta = search_by_title_author(parsed["title"], parsed["authors"])
-            
-            if not official_meta:
-                # 无匹配结果，判定L2
-                citation_levels.append(2)
-                print(f"[L2] {arxiv_id} 引用{idx+1}: 完全捏造")
-                continue
-            
-            # 步骤3：元数据比对（L1/L0）
-            level = compare_metadata(parsed, official_meta)
-            citation_levels.append(level)
-            level_name = {0: "L0", 1: "L1", 2: "L2"}[level]
-            print(f"[{level_name}] {arxiv_id} 引用{idx+1}: {level_name}")
-            
-            # 限流：避免API请求过快
-            time.sleep(0.5)
-
-        # 计算AI率（L0=0, L1=1, L2=2，求平均）
-        if not citation_levels:
-            ai_rate = 0.0
-        else:
-            ai_rate = sum(citation_levels) / len(citation_levels)
+                verdict = {"source": "empty", "level": 2}  # 空引用判定L2
+            else:
+                try:
+                    verdict = verify_citation(cite_text, cite.get("arxiv_id"), arxiv_meta)
+                except CitationLookupError:
+                    incomplete += 1
+                    continue
+                level_name = {0: "L0", 1: "L1", 2: "L2"}[verdict["level"]]
+                print(f"[{level_name}] {arxiv_id} 引用{idx+1}: {'完全捏造' if verdict['source'] == 'none' else level_name}")
+            log.append(dict(verdict, arxiv_id=arxiv_id, idx=idx, text_hash=hashes[idx],
+                            at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())))
+            # 限流由 api.ratelimit 的共享预算负责（跨进程、遇 429 自动退避）
+
+        if incomplete:
+            print(f"[PARTIAL] {arxiv_id}: {incomplete} 条引用查询失败，下次运行时重试")
+            return None
+        log.append({"arxiv_id": arxiv_id, "done": hashes})
+        ai_rate = log.paper_rate(arxiv_id)
         print(f"[DONE] {arxiv_id} 引用AI率: {ai_rate:.2f}")
         return ai_rate
 
     except Exception as e:
         print(f"[ERROR] 处理 {arxiv_id} 失败: {str(e)}")
-        return 0.0
+        return None
+
+def save_rates(rates: Dict, path: str = RESULT_SAVE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({aid: (round(r, 4) if r is not None else None) for aid, r in rates.items()},
+                  f, ensure_ascii=False, indent=2)  # 保留4位小数
 
 # ====================== 主函数 ======================
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Verify references and compute per-paper citation AI rates.")
+    ap.add_argument("--log", type=str, default=CITATION_LOG_PATH, help="Append-only per-citation log (resumed from)")
+    ap.add_argument("--out", type=str, default=RESULT_SAVE_PATH, help="Per-paper rates JSON")
+    ap.add_argument("--reaggregate", action="store_true",
+                    help="Recompute rates from the log only (no network), e.g. with new thresholds")
+    ap.add_argument("--title_threshold", type=float, default=TITLE_SIMILARITY_THRESHOLD,
+                    help="Title similarity below which a match counts as L2")
+    ap.add_argument("--journal_threshold", type=float, default=JOURNAL_SIMILARITY_THRESHOLD,
+                    help="Venue similarity below which a match counts as L1")
+    args = ap.parse_args(argv)
+
+    log = CitationLog(args.log, args.title_threshold, args.journal_threshold)
+    if args.reaggregate:
+        rates = log.rates()
+        save_rates(rates, args.out)
+        print(f"已按日志重新汇总 {len(rates)} 篇论文，结果已保存至: {args.out}")
+        return
+
     print("开始处理所有论文的引用验证...")
     # 1. 获取所有ref.json路径
     ref_files = get_all_ref_json_paths()
-    if not ref_files:
+    no_refs = get_papers_without_refs()
+    if not ref_files and not no_refs:
         print("未找到任何ref.json文件")
         return
 
-    # 2. 处理每篇论文
-    final_results = {}
+    # 预先批量查询尚未完成论文中的 arXiv 引用（每次请求数百个ID）
+    all_arxiv_ids = []
     for file_info in ref_files:
-        arxiv_id = file_info["arxiv_id"]
-        ref_path = file_info["ref_path"]
-        ai_rate = process_paper_citations(arxiv_id, ref_path)
-        final_results[arxiv_id] = round(ai_rate, 4)  # 保留4位小数
-
-    # 3. 保存结果到JSON
-    with open(RESULT_SAVE_PATH, "w", encoding="utf-8") as f:
-        json.dump(final_results, f, ensure_ascii=False, indent=2)
+        try:
+            with open(file_info["ref_path"], "r", encoding="utf-8") as f:
+                citations = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not log.is_done(file_info["arxiv_id"], [_text_hash(c.get("text", "").strip()) for c in citations]):
+            all_arxiv_ids.extend(c.get("arxiv_id") for c in citations if c.get("arxiv_id"))
+    if all_arxiv_ids:
+        verified = verify_arxiv_ids(all_arxiv_ids)
+        print(f"arXiv 快速通道: {len(set(all_arxiv_ids))} 个ID, {sum(1 for v in verified.values() if v)} 个已确认")
+
+    # 2. 处理每篇论文（逐条写日志，可随时中断后续跑）
+    final_results = {}
+    # 未提取到参考文献的论文无法计算引用AI率，记为 null（而不是 0.0）
+    for arxiv_id in no_refs:
+        print(f"[NOREF] {arxiv_id} 无参考文献数据（正文来源不含引用），记为 null")
+        final_results[arxiv_id] = None
+    try:
+        for file_info in ref_files:
+            arxiv_id = file_info["arxiv_id"]
+            final_results[arxiv_id] = process_paper_citations(arxiv_id, file_info["ref_path"], log)
+    finally:
+        log.close()
+
+    # 3. 保存结果到JSON（未完成的论文记为 null）
+    save_rates(final_results, args.out)
     
-    print(f"\n处理完成！结果已保存至: {RESULT_SAVE_PATH}")
-    print(f"共处理 {len(final_results)} 篇论文")
+    print(f"\n处理完成！结果已保存至: {args.out}")
+    failed = sum(1 for r in final_results.values() if r is None) - len(no_refs)
+    print(f"共处理 {len(final_results)} 篇论文" + (f"，其中 {failed} 篇未完成（重新运行以续跑）" if failed else "")
+          + (f"，{len(no_refs)} 篇无参考文献" if no_refs else ""))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()